@@ -0,0 +1,15 @@
+"""Space Cat Adventure game logic, importable without pgzero"""
+
+from .constants import (
+    WIDTH, HEIGHT, TITLE, CELL_SIZE, GRID_WIDTH, GRID_HEIGHT,
+    STATE_MENU, STATE_PLAYING, STATE_GAME_OVER, STATE_LEVEL_COMPLETE,
+    STATE_PLANET_INTRO, PLANET_NAMES,
+    ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, ACTION_SELECT,
+    ACTION_MUTE, MOVE_ACTIONS, SOUND_BUTTON_POS, QUIT_BUTTON_POS,
+)
+from .core import AnimatedSprite, Player, Enemy, EnemyPool, Game
+from .grid import (
+    CELL_EMPTY, CELL_WALL, CELL_PORTAL, CELL_SPAWN, OccupancyGrid, EnemyIndex,
+)
+from .levels import LevelLayout, generate_level
+from .swarm import Swarm, EnemyView, swarm_available
@@ -0,0 +1,99 @@
+"""Sound effects and music, loaded and played off the game thread
+
+An AudioManager owns everything the game plays. Game only puts play and
+stop requests on its queue, which never blocks; a worker thread decodes the
+short sound effects once at startup and then carries the requests out.
+Long tracks listed as `streamed` are not decoded up front but played with
+pygame.mixer.music, which reads them from disk as they play.
+
+Requests made before the sounds are loaded wait in the queue, and the
+manager goes quiet instead of failing when there is no audio device.
+"""
+
+import os
+import queue
+import threading
+
+import pygame
+
+
+SOUND_EXTENSIONS = (".ogg", ".wav", ".oga")
+STREAMED = ("game_music",)
+
+
+class AudioManager:
+
+    def __init__(self, directory, streamed=STREAMED):
+        """Load the sounds in `directory`, streaming those named in `streamed`"""
+        self.directory = directory
+        self.streamed = set(streamed)
+        self.sounds = {}
+        self.paths = {}
+        self.current_music = None
+        self.requests = queue.SimpleQueue()
+        self.ready = threading.Event()
+        self.worker = threading.Thread(target=self.run, name="audio", daemon=True)
+        self.worker.start()
+
+    def play(self, name, loops=0):
+        self.requests.put(("play", name, loops))
+
+    def stop(self, name):
+        self.requests.put(("stop", name, 0))
+
+    def close(self):
+        self.requests.put(None)
+        self.worker.join()
+
+    def run(self):
+        self.preload()
+        self.ready.set()
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            command, name, loops = request
+            try:
+                if command == "play":
+                    self.start(name, loops)
+                else:
+                    self.halt(name)
+            except pygame.error:
+                pass
+
+    def preload(self):
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error:
+                return
+        try:
+            filenames = sorted(os.listdir(self.directory))
+        except OSError:
+            return
+        for filename in filenames:
+            name, extension = os.path.splitext(filename)
+            if extension.lower() not in SOUND_EXTENSIONS or name in self.paths:
+                continue
+            path = os.path.join(self.directory, filename)
+            self.paths[name] = path
+            if name not in self.streamed:
+                try:
+                    self.sounds[name] = pygame.mixer.Sound(path)
+                except pygame.error:
+                    pass
+
+    def start(self, name, loops):
+        if name in self.sounds:
+            self.sounds[name].play(loops)
+        elif name in self.streamed and name in self.paths:
+            if self.current_music != name:
+                pygame.mixer.music.load(self.paths[name])
+                self.current_music = name
+            pygame.mixer.music.play(loops)
+
+    def halt(self, name):
+        if name in self.sounds:
+            self.sounds[name].stop()
+        elif name == self.current_music:
+            pygame.mixer.music.stop()
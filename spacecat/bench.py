@@ -0,0 +1,269 @@
+"""Benchmarks for level setup, the update path and each draw function
+
+Everything runs headless against an offscreen surface:
+
+    python -m spacecat.bench --levels 1,100,200 --grids 20x15,40x30 --out bench.json
+    python -m spacecat.bench --out new.json --compare bench.json
+    python -m spacecat.bench --compare bench.json new.json
+
+Each case is one (level, grid size, enemy count) combination. For every phase
+the report has mean/p50/p95/max milliseconds per call and the peak memory
+allocated by one call, plus the frames per second of a whole update + draw_game
+frame. --compare prints the p50 change per phase against an earlier report and
+exits with status 1 if any phase got slower than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import pygame
+from pgzero.screen import Screen
+
+from .cli import SWARM_MODES, parse_grids
+from .constants import WIDTH, HEIGHT, GRID_WIDTH, GRID_HEIGHT, STATE_PLAYING
+from .core import Game
+from .levels import generate_level
+from .profiler import percentile
+from .render import Renderer, init_offscreen
+
+
+FRAME_DT = 1.0 / 60
+DEFAULT_LEVELS = "1,50,100,150,200"
+DEFAULT_GRIDS = f"{GRID_WIDTH}x{GRID_HEIGHT}"
+UPDATE_PHASES = ("update_player", "update_enemies", "check_collisions", "check_portal")
+
+
+def summarize(samples, alloc_bytes):
+    ms = sorted(sample * 1000 for sample in samples)
+    return {
+        "calls": len(ms),
+        "mean_ms": sum(ms) / len(ms),
+        "p50_ms": percentile(ms, 0.50),
+        "p95_ms": percentile(ms, 0.95),
+        "max_ms": ms[-1],
+        "alloc_peak_bytes": alloc_bytes,
+    }
+
+
+def peak_allocation(func, repeat):
+    """Largest peak of memory allocated during one call of func"""
+    tracemalloc.start()
+    worst = 0
+    try:
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+class Case:
+    """One benchmarked level: a headless Game plus an offscreen renderer"""
+
+    def __init__(self, level, grid_width, grid_height, enemies, seed, swarm=None,
+                 hunters=False):
+        self.level = level
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.enemies = enemies
+        self.seed = seed
+        self.swarm = swarm
+        self.hunters = hunters
+        self.game = Game(seed=seed, grid_width=grid_width, grid_height=grid_height,
+                         swarm=swarm, hunters=hunters)
+        self.game.level = level
+        self.renderer = Renderer()
+        self.screen = Screen(pygame.Surface((WIDTH, HEIGHT)))
+
+    @property
+    def name(self):
+        enemies = "curve" if self.enemies is None else self.enemies
+        name = f"level={self.level} grid={self.grid_width}x{self.grid_height} enemies={enemies}"
+        if self.swarm is not None:
+            name += " swarm=" + ("on" if self.swarm else "off")
+        if self.hunters:
+            name += " hunters"
+        return name
+
+    def start_level(self):
+        game = self.game
+        game.level = self.level
+        if self.enemies is None:
+            game.start_level()
+        else:
+            # Game.start_level has no way to override the enemy count
+            game.load_layout(generate_level(self.level, self.seed, self.grid_width,
+                                            self.grid_height, num_enemies=self.enemies))
+
+    def draw_menu(self):
+        # An unchanged menu is not redrawn, so measure a full redraw every call
+        self.renderer.invalidate()
+        self.renderer.draw_menu(self.screen, self.game)
+
+    def phase_funcs(self):
+        game = self.game
+        screen = self.screen
+        renderer = self.renderer
+        return {
+            "update_player": lambda: game.update_player(FRAME_DT),
+            "update_enemies": lambda: game.update_enemies(FRAME_DT),
+            "check_collisions": game.check_collisions,
+            "check_portal": game.check_portal,
+            "draw_game": lambda: renderer.draw_game(screen, game),
+            "draw_menu": self.draw_menu,
+            "draw_planet_intro": lambda: renderer.draw_planet_intro(screen, game),
+        }
+
+    def run(self, frames):
+        setup_samples = []
+        for _ in range(max(1, frames // 30)):
+            start = time.perf_counter()
+            self.start_level()
+            setup_samples.append(time.perf_counter() - start)
+        setup_alloc = peak_allocation(self.start_level, 3)
+        self.game.state = STATE_PLAYING
+
+        funcs = self.phase_funcs()
+        samples = {name: [] for name in funcs}
+        frame_samples = []
+        perf_counter = time.perf_counter
+        for _ in range(frames):
+            frame_start = perf_counter()
+            for name in UPDATE_PHASES + ("draw_game",):
+                start = perf_counter()
+                funcs[name]()
+                samples[name].append(perf_counter() - start)
+            frame_samples.append(perf_counter() - frame_start)
+            self.game.dt_accumulator += FRAME_DT
+            # Collisions end the level in a real game; keep simulating here
+            self.game.state = STATE_PLAYING
+            for name in ("draw_menu", "draw_planet_intro"):
+                start = perf_counter()
+                funcs[name]()
+                samples[name].append(perf_counter() - start)
+
+        alloc_repeat = max(1, frames // 10)
+        phases = {"start_level": summarize(setup_samples, setup_alloc)}
+        for name, func in funcs.items():
+            phases[name] = summarize(samples[name], peak_allocation(func, alloc_repeat))
+        frame = summarize(frame_samples, 0)
+        return {
+            "case": self.name,
+            "level": self.level,
+            "grid": [self.grid_width, self.grid_height],
+            "enemies": len(self.game.enemies),
+            "obstacles": len(self.game.grid),
+            "phases": phases,
+            "frame_mean_ms": frame["mean_ms"],
+            "fps": 1000.0 / frame["mean_ms"],
+        }
+
+
+def parse_enemies(text):
+    return [None if item == "curve" else int(item) for item in text.split(",")]
+
+
+def run_suite(levels, grids, enemy_counts, frames, seed, swarm=None, hunters=False,
+              log=sys.stderr):
+    init_offscreen()
+    results = []
+    for grid_width, grid_height in grids:
+        for enemies in enemy_counts:
+            for level in levels:
+                case = Case(level, grid_width, grid_height, enemies, seed, swarm, hunters)
+                result = case.run(frames)
+                print(f"{case.name}: {result['fps']:.0f} fps", file=log)
+                results.append(result)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "frames": frames,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold, out=sys.stdout):
+    """Print p50 changes per phase; return True if nothing regressed"""
+    old_cases = {result["case"]: result for result in baseline["results"]}
+    ok = True
+    for result in current["results"]:
+        old = old_cases.get(result["case"])
+        if old is None:
+            print(f"{result['case']}: not in baseline", file=out)
+            continue
+        print(f"{result['case']}: {old['fps']:.0f} -> {result['fps']:.0f} fps", file=out)
+        for name, phase in result["phases"].items():
+            old_phase = old["phases"].get(name)
+            if old_phase is None or old_phase["p50_ms"] <= 0:
+                continue
+            ratio = phase["p50_ms"] / old_phase["p50_ms"]
+            marker = ""
+            if ratio > 1 + threshold:
+                marker = "  REGRESSION"
+                ok = False
+            print(f"  {name:18} {old_phase['p50_ms']:8.3f} -> {phase['p50_ms']:8.3f} ms"
+                  f" ({ratio - 1:+.0%}){marker}", file=out)
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.bench",
+                                     description=__doc__.split("\n")[0])
+    parser.add_argument("--levels", default=DEFAULT_LEVELS,
+                        help="comma separated levels (default %(default)s)")
+    parser.add_argument("--grids", default=DEFAULT_GRIDS,
+                        help="comma separated WxH grid sizes (default %(default)s)")
+    parser.add_argument("--enemies", default="curve",
+                        help="comma separated enemy counts, 'curve' for the level's own")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frames timed per case (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--swarm", choices=SWARM_MODES, default="auto",
+                        help="enemy engine, as Game(swarm=...) (default %(default)s)")
+    parser.add_argument("--hunters", action="store_true",
+                        help="enemies chase the player instead of patrolling")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                        help="baseline report, and optionally a report to compare "
+                             "instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed p50 slowdown per phase (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) > 1:
+        with open(args.compare[1]) as f:
+            report = json.load(f)
+    else:
+        report = run_suite([int(level) for level in args.levels.split(",")],
+                           parse_grids(args.grids), parse_enemies(args.enemies),
+                           args.frames, args.seed,
+                           SWARM_MODES[args.swarm],
+                           args.hunters)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        return 0 if compare(baseline, report, args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
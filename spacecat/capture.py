@@ -0,0 +1,237 @@
+"""Offscreen frame export for trailers and visual regression baselines
+
+A recorded session, or a scripted autoplay run, is stepped one logic tick at
+a time with no clock involved and drawn by the usual Renderer onto an
+offscreen surface, as fast as the machine allows. Frames go either to a
+numbered PNG sequence, compressed by a pool of worker processes, or as raw
+RGB24 to a file or pipe, written from a background thread:
+
+    python -m spacecat.capture session.json --png frames/
+    python -m spacecat.capture --autoplay --seed 3 --seconds 20 --raw - |
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i - trailer.mp4
+
+--every N keeps one tick in N, e.g. --every 60 for one still per second of
+play as regression baselines.
+"""
+
+import argparse
+import collections
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+# pygame greets on stdout when imported, which would corrupt a --raw - stream
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+from pgzero.screen import Screen
+
+from .cli import parse_grid
+from .clock import DEFAULT_TICK_RATE
+from .constants import (
+    WIDTH, HEIGHT, GRID_WIDTH, GRID_HEIGHT, STATE_MENU, STATE_PLAYING, STATE_GAME_OVER,
+    ACTION_SELECT,
+)
+from .core import Game
+from .render import Renderer, init_offscreen, new_surface
+from .replay import Recording, Replayer
+from .simulate import next_action
+
+
+PIXEL_FORMAT = "RGB"
+MAX_PENDING_PER_WORKER = 4
+AUTOPLAY_DWELL = 1.5
+
+
+def _save_png(task):
+    path, size, pixels = task
+    pygame.image.save(pygame.image.frombytes(pixels, size, PIXEL_FORMAT), path)
+
+
+class PngSequence:
+    """Writes frames as frame_000000.png, ... with a pool of encoder processes
+
+    At most MAX_PENDING_PER_WORKER frames per worker wait to be encoded;
+    past that write() waits for the oldest, so memory stays bounded.
+    """
+
+    def __init__(self, directory, workers=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = multiprocessing.Pool(self.workers)
+        self.pending = collections.deque()
+
+    def write(self, index, size, pixels):
+        path = os.path.join(self.directory, f"frame_{index:06d}.png")
+        pending = self.pending
+        while len(pending) >= self.workers * MAX_PENDING_PER_WORKER:
+            pending.popleft().get()
+        pending.append(self.pool.apply_async(_save_png, ((path, size, pixels),)))
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().get()
+        self.pool.close()
+        self.pool.join()
+
+
+class RawVideo:
+    """Writes frames back to back as raw RGB24 from a background thread
+
+    close() closes the stream too, unless it is stdout.
+    """
+
+    def __init__(self, stream, max_pending=16):
+        self.stream = stream
+        self.frames = queue.Queue(max_pending)
+        self.writer = threading.Thread(target=self.run, name="raw-video", daemon=True)
+        self.writer.start()
+
+    def write(self, index, size, pixels):
+        self.frames.put(pixels)
+
+    def run(self):
+        while True:
+            pixels = self.frames.get()
+            if pixels is None:
+                break
+            self.stream.write(pixels)
+
+    def close(self):
+        self.frames.put(None)
+        self.writer.join()
+        self.stream.flush()
+        if self.stream is not sys.stdout.buffer:
+            self.stream.close()
+
+
+class Autoplay:
+    """Plays a Game on its own: walks to each portal and restarts after a loss
+
+    Steering is simulate.next_action with the cautious policy. The menu and
+    game over screens are left up for `dwell` seconds before selecting.
+    """
+
+    def __init__(self, seed, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, hunters=False,
+                 tick_rate=DEFAULT_TICK_RATE, dwell=AUTOPLAY_DWELL):
+        self.game = Game(seed=seed, grid_width=grid_width, grid_height=grid_height,
+                         hunters=hunters)
+        self.step = 1.0 / tick_rate
+        self.dwell_ticks = int(dwell * tick_rate)
+        self.state = None
+        self.state_ticks = 0
+        self.distances = None
+        self.field_key = None
+
+    def advance(self):
+        game = self.game
+        if game.state != self.state:
+            self.state = game.state
+            self.state_ticks = 0
+        self.state_ticks += 1
+        actions = []
+        if game.state in (STATE_MENU, STATE_GAME_OVER):
+            if self.state_ticks >= self.dwell_ticks:
+                actions.append(ACTION_SELECT)
+        elif game.state == STATE_PLAYING:
+            key = (game.level, game.grid.version)
+            if key != self.field_key:
+                self.distances = game.grid.distances_from(game.portal['x'], game.portal['y'])
+                self.field_key = key
+            action = next_action(game, self.distances, True)
+            if action is not None:
+                actions.append(action)
+        game.step(self.step, actions)
+
+
+def capture(source, sink, ticks, every=1, start=0):
+    """Render every `every`-th tick of source from `start` into sink
+
+    source is a Replayer or an Autoplay: anything with a `game` and an
+    advance() that runs one logic tick. Returns the number of frames.
+    """
+    init_offscreen()
+    renderer = Renderer()
+    screen = Screen(new_surface((WIDTH, HEIGHT)))
+    size = (WIDTH, HEIGHT)
+    frames = 0
+    for tick in range(ticks):
+        if getattr(source, "done", False):
+            break
+        source.advance()
+        if tick < start or (tick - start) % every:
+            continue
+        renderer.draw(screen, source.game)
+        sink.write(frames, size, pygame.image.tobytes(screen.surface, PIXEL_FORMAT))
+        frames += 1
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.capture",
+                                     description=__doc__.split("\n")[0])
+    parser.add_argument("recording", nargs="?", help="log written with SPACECAT_RECORD")
+    parser.add_argument("--autoplay", action="store_true",
+                        help="play a new game automatically instead of a recording")
+    parser.add_argument("--seed", type=int, default=1, help="autoplay game seed")
+    parser.add_argument("--grid", default=f"{GRID_WIDTH}x{GRID_HEIGHT}",
+                        help="autoplay WxH grid size (default %(default)s)")
+    parser.add_argument("--hunters", action="store_true", help="autoplay with hunters")
+    parser.add_argument("--seconds", type=float, help="stop after this much game time")
+    parser.add_argument("--start", type=float, default=0.0,
+                        help="game time of the first captured frame (default %(default)s)")
+    parser.add_argument("--every", type=int, default=1,
+                        help="capture one tick in this many (default %(default)s)")
+    sinks = parser.add_mutually_exclusive_group(required=True)
+    sinks.add_argument("--png", metavar="DIR", help="write a numbered PNG sequence here")
+    sinks.add_argument("--raw", metavar="PATH",
+                       help="write raw RGB24 frames here, '-' for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="PNG encoder processes (default %(default)s)")
+    args = parser.parse_args(argv)
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+    if args.start < 0:
+        parser.error("--start cannot be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.autoplay == bool(args.recording):
+        parser.error("give either a recording or --autoplay")
+    if args.recording:
+        source = Replayer(Recording.load(args.recording))
+        tick_rate = source.recording.tick_rate
+        ticks = source.recording.ticks
+    else:
+        width, height = parse_grid(args.grid)
+        tick_rate = DEFAULT_TICK_RATE
+        source = Autoplay(args.seed, width, height, args.hunters, tick_rate)
+        ticks = int((args.seconds or 60.0) * tick_rate)
+    if args.seconds is not None:
+        ticks = min(ticks, int(args.seconds * tick_rate))
+
+    if args.png:
+        sink = PngSequence(args.png, args.workers)
+    elif args.raw == "-":
+        sink = RawVideo(sys.stdout.buffer)
+    else:
+        sink = RawVideo(open(args.raw, "wb"))
+
+    started = time.perf_counter()
+    try:
+        frames = capture(source, sink, ticks, args.every, int(args.start * tick_rate))
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+
+    fps = tick_rate / args.every
+    print(f"{frames} frames ({frames / fps:.1f}s at {fps:g} fps) in {elapsed:.2f}s, "
+          f"{frames / elapsed:.0f} frames/s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
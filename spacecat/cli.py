@@ -0,0 +1,25 @@
+"""Argument parsing shared by the package's command-line tools"""
+
+
+# --swarm choices, as Game(swarm=...)
+SWARM_MODES = {"auto": None, "on": True, "off": False}
+
+
+def parse_range(text):
+    """'1-5,8,10-11' -> [1, 2, 3, 4, 5, 8, 10, 11]"""
+    values = []
+    for item in text.split(","):
+        first, _, last = item.partition("-")
+        values.extend(range(int(first), int(last or first) + 1))
+    return values
+
+
+def parse_grid(text):
+    """'40x30' -> (40, 30)"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_grids(text):
+    """'20x15,40x30' -> [(20, 15), (40, 30)]"""
+    return [parse_grid(item) for item in text.split(",")]
@@ -0,0 +1,34 @@
+"""Fixed-step scheduling of game logic under a variable frame rate"""
+
+
+DEFAULT_TICK_RATE = 60
+MAX_CATCH_UP_TICKS = 5
+
+
+class FixedStepClock:
+    """Turns variable frame times into a whole number of fixed logic ticks
+
+    advance() returns how many ticks of `step` seconds to run this frame. At
+    most max_ticks run per frame; time beyond that is dropped so a long stall
+    does not make the game fast-forward. `alpha` is how far the leftover time
+    is into the next tick, for interpolating sprite positions when drawing.
+    """
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE, max_ticks=MAX_CATCH_UP_TICKS):
+        self.tick_rate = tick_rate
+        self.step = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.ticks = 0
+
+    def advance(self, frame_dt):
+        self.accumulator += frame_dt
+        ticks = int(self.accumulator / self.step)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = self.step * ticks
+        self.accumulator -= self.step * ticks
+        self.alpha = self.accumulator / self.step
+        self.ticks += ticks
+        return ticks
@@ -0,0 +1,56 @@
+"""Window, grid, state and input constants shared across the package"""
+
+
+WIDTH = 800
+HEIGHT = 600
+TITLE = "Space Cat Adventure"
+CELL_SIZE = 40
+GRID_WIDTH = WIDTH // CELL_SIZE
+GRID_HEIGHT = HEIGHT // CELL_SIZE
+
+
+STATE_MENU = "menu"
+STATE_PLAYING = "playing"
+STATE_GAME_OVER = "game_over"
+STATE_LEVEL_COMPLETE = "level_complete"
+STATE_PLANET_INTRO = "planet_intro"
+
+
+ACTION_UP = "up"
+ACTION_DOWN = "down"
+ACTION_LEFT = "left"
+ACTION_RIGHT = "right"
+ACTION_SELECT = "select"
+ACTION_MUTE = "mute"
+
+MOVE_ACTIONS = {
+    ACTION_UP: (0, -1),
+    ACTION_DOWN: (0, 1),
+    ACTION_LEFT: (-1, 0),
+    ACTION_RIGHT: (1, 0),
+}
+
+
+SOUND_BUTTON_POS = (WIDTH - 70, 25)
+QUIT_BUTTON_POS = (WIDTH - 70, 60)
+
+
+PLANET_NAMES = [
+    "NEBULA X-7",
+    "CRIMSON MARS",
+    "AQUA TITAN",
+    "SOLAR DESERT",
+    "VOID STATION",
+    "CRYSTAL MOON",
+    "PLASMA WORLD",
+    "DARK MATTER"
+]
+
+
+SPRITE_SPEED = 200
+ANIMATION_SPEED = 0.2
+# animation_frame runs over [0, ANIMATION_FRAMES) and wraps back to 0
+ANIMATION_FRAMES = 4
+IDLE_ANIMATION_FACTOR = 0.3
+ENEMY_MOVE_INTERVAL = (1.0, 2.5)
+HUNTER_MOVE_INTERVAL = (0.4, 0.8)
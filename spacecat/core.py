@@ -0,0 +1,626 @@
+import random
+import math
+from itertools import permutations
+
+from .clock import DEFAULT_TICK_RATE
+from .grid import OccupancyGrid, EnemyIndex, FlowField, CELL_SPAWN, CELL_PORTAL
+from .levels import generate_level
+from .profiler import NULL_PROFILER
+from .swarm import Swarm, ENEMY_TYPES, SWARM_MIN_ENEMIES, swarm_available
+from .constants import (
+    CELL_SIZE, GRID_WIDTH, GRID_HEIGHT,
+    STATE_MENU, STATE_PLAYING, STATE_GAME_OVER, STATE_LEVEL_COMPLETE,
+    STATE_PLANET_INTRO,
+    ACTION_UP, ACTION_DOWN, ACTION_SELECT, ACTION_MUTE, MOVE_ACTIONS,
+    SOUND_BUTTON_POS, QUIT_BUTTON_POS,
+    SPRITE_SPEED, ANIMATION_SPEED, ANIMATION_FRAMES, IDLE_ANIMATION_FACTOR,
+    ENEMY_MOVE_INTERVAL, HUNTER_MOVE_INTERVAL,
+)
+
+
+# Every order the four patrol directions can be tried in
+PATROL_ORDERS = tuple(permutations([(0, 1), (0, -1), (1, 0), (-1, 0)]))
+
+
+class AnimatedSprite:
+
+    __slots__ = ("grid_x", "grid_y", "target_x", "target_y", "x", "y",
+                 "prev_x", "prev_y", "color", "size", "appearance",
+                 "animation_frame", "animation_speed", "is_moving", "direction")
+ 
+    def __init__(self, grid_x, grid_y, color, size=30):
+        self.color = color
+        self.size = size
+        self.animation_speed = ANIMATION_SPEED
+        self.appearance = self.appearance_key()
+        self.reset(grid_x, grid_y)
+        
+    def reset(self, grid_x, grid_y):
+        """Put the sprite at rest on a cell, as a newly made one would be"""
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.target_x = grid_x
+        self.target_y = grid_y
+        self.x = grid_x * CELL_SIZE + CELL_SIZE // 2
+        self.y = grid_y * CELL_SIZE + CELL_SIZE // 2
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.animation_frame = 0
+        self.is_moving = False
+        self.direction = "down"
+        
+    def update_position(self, dt):
+       
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
+        target_pixel_x = self.target_x * CELL_SIZE + CELL_SIZE // 2
+        target_pixel_y = self.target_y * CELL_SIZE + CELL_SIZE // 2
+        
+        speed = SPRITE_SPEED * dt
+        dx = target_pixel_x - self.x
+        dy = target_pixel_y - self.y
+        distance = math.sqrt(dx * dx + dy * dy)
+        
+        if distance < 2:
+            self.x = target_pixel_x
+            self.y = target_pixel_y
+            self.grid_x = self.target_x
+            self.grid_y = self.target_y
+            self.is_moving = False
+        else:
+            self.x += (dx / distance) * speed
+            self.y += (dy / distance) * speed
+            self.is_moving = True
+            
+    def update_animation(self, dt):
+        # animation_speed is per tick at DEFAULT_TICK_RATE
+        ticks = dt * DEFAULT_TICK_RATE
+        if self.is_moving:
+            self.animation_frame += self.animation_speed * ticks
+        else:
+            self.animation_frame += self.animation_speed * IDLE_ANIMATION_FACTOR * ticks
+            
+        if self.animation_frame >= ANIMATION_FRAMES:
+            self.animation_frame = 0
+            
+    def render_position(self, alpha):
+        """Pixel position alpha of the way from the previous tick to this one"""
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
+        
+    def appearance_key(self):
+        return (type(self).__name__, self.color, self.size)
+        
+    def can_move_to(self, grid_x, grid_y, grid):
+      
+        return grid.is_walkable(grid_x, grid_y)
+
+
+class Player(AnimatedSprite):
+
+    __slots__ = ("helmet_color",)
+ 
+    def __init__(self, grid_x, grid_y):
+        super().__init__(grid_x, grid_y, (30, 30, 30), size=32)
+        self.helmet_color = (200, 200, 255)
+        
+    def move(self, dx, dy, grid, enemies):
+        """Move player if not currently moving"""
+        if self.is_moving:
+            return False
+            
+        new_x = self.grid_x + dx
+        new_y = self.grid_y + dy
+        
+        if self.can_move_to(new_x, new_y, grid):
+            self.target_x = new_x
+            self.target_y = new_y
+            
+            if dx > 0:
+                self.direction = "right"
+            elif dx < 0:
+                self.direction = "left"
+            elif dy > 0:
+                self.direction = "down"
+            elif dy < 0:
+                self.direction = "up"
+            return True
+        return False
+        
+    def draw(self, screen):
+        self.draw_at(screen, self.x, self.y, self.animation_frame, self.is_moving)
+        
+    def draw_at(self, screen, x, y, animation_frame, is_moving, detailed=True):
+        """Draw at (x, y); without `detailed`, whiskers and highlights are left out"""
+        frame_offset = int(animation_frame)
+        breath = math.sin(animation_frame * 2) * 2
+        
+        body_size = self.size + (2 if frame_offset % 2 == 0 else 0)
+        screen.draw.filled_circle((x, y), body_size // 2, self.color)
+        
+        leg_y = y + body_size // 2 - 3
+        leg_offset = 8
+        if is_moving:
+            if frame_offset % 2 == 0:
+                screen.draw.filled_circle((x - leg_offset, leg_y + 2), 4, self.color)
+                screen.draw.filled_circle((x + leg_offset, leg_y), 4, self.color)
+            else:
+                screen.draw.filled_circle((x - leg_offset, leg_y), 4, self.color)
+                screen.draw.filled_circle((x + leg_offset, leg_y + 2), 4, self.color)
+        else:
+            screen.draw.filled_circle((x - leg_offset, leg_y), 4, self.color)
+            screen.draw.filled_circle((x + leg_offset, leg_y), 4, self.color)
+        
+        screen.draw.circle((x, y - 1), self.size // 2 + 2, (150, 150, 150))
+        
+        helmet_size = self.size - 2
+        screen.draw.filled_circle((x, y - 2), helmet_size // 2, 
+                                 (180, 200, 255, 120))
+        
+        if detailed:
+            screen.draw.filled_circle((x - 6, y - 10), 5, (255, 255, 255, 200))
+            screen.draw.filled_circle((x - 3, y - 8), 3, (255, 255, 255, 150))
+        
+        eye_offset = 7
+        eye_y = y - 3 + breath
+        screen.draw.filled_circle((x - eye_offset, eye_y), 5, (255, 255, 120))
+        screen.draw.filled_circle((x + eye_offset, eye_y), 5, (255, 255, 120))
+        
+        if detailed:
+            screen.draw.filled_circle((x - eye_offset - 1, eye_y - 1), 2, (255, 255, 200))
+            screen.draw.filled_circle((x + eye_offset - 1, eye_y - 1), 2, (255, 255, 200))
+        
+        screen.draw.line((x - eye_offset, eye_y - 2), 
+                        (x - eye_offset, eye_y + 2), (0, 0, 0))
+        screen.draw.line((x + eye_offset, eye_y - 2), 
+                        (x + eye_offset, eye_y + 2), (0, 0, 0))
+        
+        if not is_moving or frame_offset < 2:
+            screen.draw.filled_circle((x - 13, y - 16), 6, self.color)
+            screen.draw.filled_circle((x - 13, y - 15), 3, (255, 150, 150))
+            screen.draw.filled_circle((x + 13, y - 16), 6, self.color)
+            screen.draw.filled_circle((x + 13, y - 15), 3, (255, 150, 150))
+        
+        screen.draw.filled_circle((x, y + 3), 2, (255, 150, 180))
+        
+        if detailed:
+            whisker_y = y + 2
+            screen.draw.line((x - 15, whisker_y), (x - 8, whisker_y), (200, 200, 200))
+            screen.draw.line((x + 15, whisker_y), (x + 8, whisker_y), (200, 200, 200))
+            screen.draw.line((x - 15, whisker_y - 2), (x - 8, whisker_y - 1), (200, 200, 200))
+            screen.draw.line((x + 15, whisker_y - 2), (x + 8, whisker_y - 1), (200, 200, 200))
+        
+        tail_wave = math.sin(animation_frame * 3) * 3
+        screen.draw.line((x - body_size//2, y + 5), 
+                        (x - body_size//2 - 8, y + 10 + tail_wave), self.color)
+        screen.draw.circle((x - body_size//2 - 8, y + 10 + tail_wave), 3, self.color)
+
+
+class Enemy(AnimatedSprite):
+
+    __slots__ = ("enemy_type", "segment_color", "move_timer", "move_interval", "rng")
+   
+    def __init__(self, grid_x, grid_y, enemy_type="green", rng=random):
+        if enemy_type == "green":
+            color = (100, 255, 100)
+        else:
+            color = (255, 150, 200)
+            
+        self.enemy_type = enemy_type
+        self.rng = rng
+        self.segment_color = tuple(max(0, c - 30) for c in color)
+        super().__init__(grid_x, grid_y, color, size=28)
+        
+    def reset(self, grid_x, grid_y):
+        super().reset(grid_x, grid_y)
+        self.move_timer = 0
+        self.move_interval = self.rng.uniform(*ENEMY_MOVE_INTERVAL)
+        
+    def appearance_key(self):
+        return super().appearance_key() + (self.enemy_type,)
+        
+    def update(self, dt, grid, player, enemy_index, distances=None):
+        """Move, animate and pick the next cell; hunt along `distances` if given"""
+        old_x = self.grid_x
+        old_y = self.grid_y
+        self.update_position(dt)
+        if self.grid_x != old_x or self.grid_y != old_y:
+            enemy_index.moved(self, old_x, old_y)
+        self.update_animation(dt)
+        
+        if not self.is_moving:
+            self.move_timer += dt
+            if self.move_timer >= self.move_interval:
+                self.move_timer = 0
+                if distances is None:
+                    self.move_interval = self.rng.uniform(*ENEMY_MOVE_INTERVAL)
+                    self.patrol(grid, enemy_index)
+                else:
+                    self.move_interval = self.rng.uniform(*HUNTER_MOVE_INTERVAL)
+                    self.hunt(grid, enemy_index, distances)
+                
+    def patrol(self, grid, enemy_index):
+     
+        directions = PATROL_ORDERS[self.rng.randrange(len(PATROL_ORDERS))]
+        
+        for dx, dy in directions:
+            new_x = self.grid_x + dx
+            new_y = self.grid_y + dy
+            
+            if (self.can_move_to(new_x, new_y, grid) and
+                not enemy_index.is_reserved(new_x, new_y)):
+                enemy_index.reserve(self, new_x, new_y)
+                break
+                
+    def hunt(self, grid, enemy_index, distances):
+        """Step to the free neighbour nearest the player, by the shared flow field
+        
+        Waits when every closer cell is taken and patrols when the player
+        cannot be reached at all.
+        """
+        width = grid.width
+        best = distances[self.grid_y * width + self.grid_x]
+        if best < 0:
+            self.patrol(grid, enemy_index)
+            return
+            
+        target_x = target_y = None
+        for dx, dy in PATROL_ORDERS[0]:
+            new_x = self.grid_x + dx
+            new_y = self.grid_y + dy
+            if not grid.in_bounds(new_x, new_y):
+                continue
+            distance = distances[new_y * width + new_x]
+            if (0 <= distance < best and
+                not enemy_index.is_reserved(new_x, new_y)):
+                best = distance
+                target_x = new_x
+                target_y = new_y
+                
+        if target_x is not None:
+            enemy_index.reserve(self, target_x, target_y)
+                
+    def draw(self, screen):
+        self.draw_at(screen, self.x, self.y, self.animation_frame, self.is_moving)
+        
+    def draw_at(self, screen, x, y, animation_frame, is_moving, detailed=True):
+        """Draw at (x, y); without `detailed`, antennae and highlights are left out"""
+        frame_offset = int(animation_frame)
+        bob = math.sin(animation_frame * 3) * 3
+        
+        body_y = y + bob
+        screen.draw.filled_circle((x, body_y), self.size // 2, self.color)
+        
+        segment_color = self.segment_color
+        screen.draw.circle((x, body_y - 6), 6, segment_color)
+        screen.draw.circle((x, body_y + 2), 8, segment_color)
+        
+        arm_wave = math.sin(animation_frame * 4) * 2
+    
+        screen.draw.line((x - 8, body_y), 
+                        (x - 15, body_y + 8 + arm_wave), self.color)
+        screen.draw.filled_circle((x - 15, body_y + 8 + arm_wave), 3, self.color)
+     
+        screen.draw.line((x + 8, body_y), 
+                        (x + 15, body_y + 8 - arm_wave), self.color)
+        screen.draw.filled_circle((x + 15, body_y + 8 - arm_wave), 3, self.color)
+        
+        eye_offset = 9
+        eye_y = body_y - 5
+        
+        screen.draw.filled_circle((x - eye_offset, eye_y), 8, (255, 255, 255))
+        screen.draw.filled_circle((x + eye_offset, eye_y), 8, (255, 255, 255))
+        
+        iris_color = (100, 255, 100) if self.enemy_type == "green" else (255, 100, 200)
+        screen.draw.filled_circle((x - eye_offset, eye_y), 6, iris_color)
+        screen.draw.filled_circle((x + eye_offset, eye_y), 6, iris_color)
+        
+        pupil_offset = 2 if frame_offset % 2 == 0 else -2
+        screen.draw.filled_circle((x - eye_offset + pupil_offset, eye_y), 4, (0, 0, 0))
+        screen.draw.filled_circle((x + eye_offset + pupil_offset, eye_y), 4, (0, 0, 0))
+        
+        if detailed:
+            screen.draw.filled_circle((x - eye_offset - 2, eye_y - 2), 2, (255, 255, 255))
+            screen.draw.filled_circle((x + eye_offset - 2, eye_y - 2), 2, (255, 255, 255))
+  
+        mouth_y = body_y + 5
+        screen.draw.line((x - 5, mouth_y), (x + 5, mouth_y), (50, 50, 50))
+        
+        if detailed:
+            antenna_wave = math.sin(animation_frame * 4) * 3
+            antenna_color = (255, 255, 100) if self.enemy_type == "green" else (255, 100, 255)
+       
+            screen.draw.line((x - 10, body_y - 12), 
+                            (x - 13, body_y - 22 + antenna_wave), self.color)
+            screen.draw.filled_circle((x - 13, body_y - 22 + antenna_wave), 4, antenna_color)
+            screen.draw.filled_circle((x - 13, body_y - 22 + antenna_wave), 2, (255, 255, 255))
+        
+            screen.draw.line((x + 10, body_y - 12), 
+                            (x + 13, body_y - 22 - antenna_wave), self.color)
+            screen.draw.filled_circle((x + 13, body_y - 22 - antenna_wave), 4, antenna_color)
+            screen.draw.filled_circle((x + 13, body_y - 22 - antenna_wave), 2, (255, 255, 255))
+        
+        if self.enemy_type == "green":
+            screen.draw.filled_circle((x - 5, body_y + 3), 2, (80, 200, 80))
+            screen.draw.filled_circle((x + 4, body_y - 2), 2, (80, 200, 80))
+        else:
+            screen.draw.filled_circle((x - 5, body_y + 3), 2, (255, 120, 180))
+            screen.draw.filled_circle((x + 4, body_y - 2), 2, (255, 120, 180))
+
+
+class EnemyPool:
+    """Enemies from earlier levels, kept by type and reused before making new ones"""
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.free = {}
+        
+    def acquire(self, grid_x, grid_y, enemy_type):
+        free = self.free.get(enemy_type)
+        if not free:
+            return Enemy(grid_x, grid_y, enemy_type, self.rng)
+        enemy = free.pop()
+        enemy.reset(grid_x, grid_y)
+        return enemy
+        
+    def release(self, enemies):
+        for enemy in enemies:
+            self.free.setdefault(enemy.enemy_type, []).append(enemy)
+
+
+class Game:
+    """Game state and rules, steppable with or without the pgzero frontend
+
+    `sounds` is a spacecat.audio.AudioManager when running in a window;
+    leave it as None for a headless game. Whether anything is heard is
+    decided by `sounds_enabled` alone. `seed` fixes the generated levels; a random
+    one is picked when it is not given. The playfield defaults to one cell
+    per CELL_SIZE pixels of the window.
+    
+    `swarm` picks the enemy engine: True always uses the NumPy Swarm, False
+    always uses Enemy objects, and None switches to the swarm for levels with
+    at least SWARM_MIN_ENEMIES enemies when NumPy is installed. With
+    `hunters` set, enemies chase the player along one shared flow field
+    instead of patrolling.
+    
+    All randomness during play comes from `rng`, seeded from `seed`, so a
+    game replays exactly from its seed and inputs. Set `recording` to a
+    spacecat.replay.Recording to log those inputs, stamped with `tick`.
+    
+    Levels are generated when they start unless `level_preparer` is set to
+    a spacecat.levels.LevelPreparer, which makes the next one in the
+    background while the current one is played. Set `level_pack` to a
+    spacecat.levelpack.LevelPack to play its levels instead; levels past
+    the end of the pack are generated as usual.
+    """
+   
+    def __init__(self, sounds=None, seed=None, grid_width=GRID_WIDTH,
+                 grid_height=GRID_HEIGHT, swarm=None, hunters=False):
+        if swarm and not swarm_available():
+            raise ImportError("swarm mode needs NumPy")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tick = 0
+        self.recording = None
+        self.state = STATE_MENU
+        self.level = 1
+        self.player = None
+        self.enemies = []
+        self.grid = OccupancyGrid(grid_width, grid_height)
+        self.enemy_index = EnemyIndex(grid_width, grid_height)
+        self.flow_field = FlowField(self.grid)
+        self.hunters = hunters
+        self.enemy_pool = EnemyPool(self.rng)
+        self.enemy_prototypes = None
+        self.level_preparer = None
+        self.level_pack = None
+        self.planet = 0
+        self.swarm_mode = swarm
+        self.swarm = None
+        self.portal = None
+        self.sounds = sounds
+        self.sounds_enabled = True
+        self.menu_selection = 0
+        self.dt_accumulator = 0
+        self.planet_intro_timer = 0
+        self.quit_requested = False
+        self.profiler = NULL_PROFILER
+        
+    def play_sound(self, name, loops=0):
+        if self.sounds is not None and self.sounds_enabled:
+            self.sounds.play(name, loops)
+            
+    def stop_sound(self, name):
+        if self.sounds is not None:
+            self.sounds.stop(name)
+            
+    def toggle_sounds(self):
+        self.sounds_enabled = not self.sounds_enabled
+        if not self.sounds_enabled:
+            self.stop_sound("game_music")
+        else:
+            self.play_sound("game_music", -1)
+            
+    def start_level(self):
+        layout = None
+        if self.level_pack is not None and self.level in self.level_pack:
+            layout = self.level_pack.layout(self.level)
+        elif self.level_preparer is not None:
+            layout = self.level_preparer.take(self.level, self.seed,
+                                              self.grid.width, self.grid.height)
+        if layout is None:
+            layout = generate_level(self.level, self.seed,
+                                    self.grid.width, self.grid.height)
+        self.load_layout(layout)
+        self.prepare_level(self.level + 1)
+        
+    def prepare_level(self, level):
+        """Start generating `level` in the background, given a level_preparer"""
+        if self.level_pack is not None and level in self.level_pack:
+            return
+        if self.level_preparer is not None:
+            self.level_preparer.prepare(level, self.seed, self.grid.width,
+                                        self.grid.height)
+        
+    def load_layout(self, layout):
+        self.state = STATE_PLANET_INTRO
+        self.planet_intro_timer = 0
+        self.planet = layout.planet
+        
+        if self.swarm is None:
+            self.enemy_pool.release(self.enemies)
+        self.enemies.clear()
+        self.enemy_index.clear()
+        self.grid.clear()
+        
+        start_x, start_y = layout.player_start
+        portal_x, portal_y = layout.portal
+        
+        if self.player is None:
+            self.player = Player(start_x, start_y)
+        else:
+            self.player.reset(start_x, start_y)
+        self.portal = {'x': portal_x, 'y': portal_y}
+        self.grid.mark(start_x, start_y, CELL_SPAWN)
+        self.grid.mark(portal_x, portal_y, CELL_PORTAL)
+        
+        for x, y in layout.obstacles:
+            self.grid.add_obstacle(x, y)
+        
+        use_swarm = self.swarm_mode
+        if use_swarm is None:
+            use_swarm = (swarm_available() and
+                         len(layout.enemies) >= SWARM_MIN_ENEMIES)
+        if use_swarm:
+            if self.enemy_prototypes is None:
+                self.enemy_prototypes = {enemy_type: Enemy(0, 0, enemy_type, self.rng)
+                                         for enemy_type in ENEMY_TYPES}
+            self.swarm = Swarm(layout.enemies, self.seed * 1000003 + layout.level,
+                               self.enemy_prototypes)
+            self.enemies.extend(self.swarm.views)
+        else:
+            self.swarm = None
+            for x, y, enemy_type in layout.enemies:
+                enemy = self.enemy_pool.acquire(x, y, enemy_type)
+                self.enemies.append(enemy)
+                self.enemy_index.add(enemy)
+        
+    def check_collisions(self):
+        x = self.player.grid_x
+        y = self.player.grid_y
+        if self.swarm is not None:
+            hit = self.swarm.any_at(x, y)
+        else:
+            hit = bool(self.enemy_index.enemies_at(x, y))
+        if hit:
+            self.state = STATE_GAME_OVER
+            self.stop_sound("game_music")
+            self.play_sound("over")
+                
+    def check_portal(self):
+        if self.grid.flags(self.player.grid_x, self.player.grid_y) & CELL_PORTAL:
+            self.level += 1
+            self.start_level()
+            
+    def begin_playing(self):
+        self.state = STATE_PLAYING
+        self.play_sound("game_music")
+            
+    def handle_action(self, action):
+        if self.state == STATE_MENU:
+            if action == ACTION_UP:
+                self.menu_selection = (self.menu_selection - 1) % 3
+            elif action == ACTION_DOWN:
+                self.menu_selection = (self.menu_selection + 1) % 3
+            elif action == ACTION_SELECT:
+                if self.menu_selection == 0:
+                    self.level = 1
+                    self.start_level()
+                    self.stop_sound("game_music")
+                elif self.menu_selection == 1:
+                    self.toggle_sounds()
+                elif self.menu_selection == 2:
+                    self.quit_requested = True
+        
+        elif self.state == STATE_PLANET_INTRO:
+            if action == ACTION_SELECT:
+                self.begin_playing()
+                
+        elif self.state == STATE_PLAYING:
+            if action in MOVE_ACTIONS:
+                dx, dy = MOVE_ACTIONS[action]
+                self.player.move(dx, dy, self.grid, self.enemies)
+            elif action == ACTION_MUTE:
+                self.toggle_sounds()
+                
+        elif self.state == STATE_GAME_OVER:
+            if action == ACTION_SELECT:
+                self.state = STATE_MENU
+                self.menu_selection = 0
+                self.prepare_level(1)
+                self.stop_sound("over")
+                self.play_sound("game_music", -1)
+                    
+        elif self.state == STATE_LEVEL_COMPLETE:
+            if action == ACTION_SELECT:
+                self.start_level()
+                
+    def handle_click(self, pos):
+        if self.recording is not None:
+            self.recording.add_click(self.tick, pos)
+        sound_x, sound_y = SOUND_BUTTON_POS
+        quit_x, quit_y = QUIT_BUTTON_POS
+        
+        if (sound_x - 30 <= pos[0] <= sound_x + 30 and
+            sound_y - 15 <= pos[1] <= sound_y + 15):
+            self.toggle_sounds()
+            return
+        
+        if (quit_x - 30 <= pos[0] <= quit_x + 30 and
+            quit_y - 15 <= pos[1] <= quit_y + 15):
+            self.state = STATE_MENU
+            self.prepare_level(1)
+            
+    def step(self, dt, inputs=()):
+        """Apply queued actions, then advance the simulation by dt seconds"""
+        for action in inputs:
+            if self.recording is not None:
+                self.recording.add_action(self.tick, action)
+            self.handle_action(action)
+            
+        self.dt_accumulator += dt
+        
+        if self.state == STATE_PLANET_INTRO:
+            self.planet_intro_timer += dt
+            if self.planet_intro_timer >= 3.0:  
+                self.begin_playing()
+        
+        elif self.state == STATE_PLAYING:
+            profiler = self.profiler
+            with profiler.section("update_player"):
+                self.update_player(dt)
+            with profiler.section("update_enemies"):
+                self.update_enemies(dt)
+            with profiler.section("check_collisions"):
+                self.check_collisions()
+            with profiler.section("check_portal"):
+                self.check_portal()
+                
+        self.tick += 1
+            
+    def update_player(self, dt):
+        self.player.update_position(dt)
+        self.player.update_animation(dt)
+        
+    def update_enemies(self, dt):
+        distances = None
+        if self.hunters:
+            distances = self.flow_field.distances_to(self.player.grid_x, self.player.grid_y)
+        if self.swarm is not None:
+            self.swarm.update(dt, self.grid, distances)
+            return
+        for enemy in self.enemies:
+            enemy.update(dt, self.grid, self.player, self.enemy_index, distances)
@@ -0,0 +1,151 @@
+"""Per-cell lookup structures for the playfield"""
+
+
+CELL_EMPTY = 0
+CELL_WALL = 1
+CELL_PORTAL = 2
+CELL_SPAWN = 4
+
+
+class OccupancyGrid:
+    """Flat per-cell flags for walls, portal and spawn cells"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+        self.obstacles = []
+        self.version = 0
+
+    def clear(self):
+        self.cells[:] = bytes(len(self.cells))
+        self.obstacles.clear()
+        self.version += 1
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def flags(self, x, y):
+        return self.cells[y * self.width + x]
+
+    def mark(self, x, y, flag):
+        self.cells[y * self.width + x] |= flag
+
+    def add_obstacle(self, x, y):
+        self.cells[y * self.width + x] |= CELL_WALL
+        self.obstacles.append((x, y))
+        self.version += 1
+
+    def remove_obstacle(self, x, y):
+        self.cells[y * self.width + x] &= ~CELL_WALL
+        self.obstacles.remove((x, y))
+        self.version += 1
+
+    def is_free(self, x, y):
+        return self.in_bounds(x, y) and self.cells[y * self.width + x] == CELL_EMPTY
+
+    def is_walkable(self, x, y):
+        return (self.in_bounds(x, y) and
+                not self.cells[y * self.width + x] & CELL_WALL)
+
+    def distances_from(self, x, y):
+        """BFS step counts from (x, y) to every cell, -1 where unreachable"""
+        width = self.width
+        cells = self.cells
+        # Search a copy bordered by walls so neighbours need no bounds checks;
+        # -2 marks walls, -1 cells not reached yet
+        stride = width + 2
+        distances = [-2] * (stride * (self.height + 2))
+        for row in range(self.height):
+            base = (row + 1) * stride + 1
+            distances[base:base + width] = [-2 if cell & CELL_WALL else -1
+                                            for cell in cells[row * width:(row + 1) * width]]
+        start = (y + 1) * stride + x + 1
+        distances[start] = 0
+        frontier = [start]
+        steps = 0
+        while frontier:
+            steps += 1
+            next_frontier = []
+            for cell in frontier:
+                for neighbour in (cell - stride, cell + stride, cell - 1, cell + 1):
+                    if distances[neighbour] == -1:
+                        distances[neighbour] = steps
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        result = []
+        for row in range(self.height):
+            base = (row + 1) * stride + 1
+            result.extend(distances[base:base + width])
+        return [distance if distance >= 0 else -1 for distance in result]
+
+    def __iter__(self):
+        return iter(self.obstacles)
+
+    def __len__(self):
+        return len(self.obstacles)
+
+
+class FlowField:
+    """BFS distances to one target cell, shared by everything heading there
+
+    The field is rebuilt only when the target moves to another cell or the
+    grid's obstacles change; every other call returns the cached list.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.target = None
+        self.grid_version = -1
+        self.distances = None
+        self.builds = 0
+
+    def distances_to(self, x, y):
+        grid = self.grid
+        if self.target != (x, y) or self.grid_version != grid.version:
+            self.distances = grid.distances_from(x, y)
+            self.target = (x, y)
+            self.grid_version = grid.version
+            self.builds += 1
+        return self.distances
+
+
+class EnemyIndex:
+    """Enemies bucketed by current cell, plus target cell reservations"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.occupants = {}
+        self.reservations = [0] * (width * height)
+
+    def clear(self):
+        self.occupants.clear()
+        self.reservations = [0] * (self.width * self.height)
+
+    def add(self, enemy):
+        cell = enemy.grid_y * self.width + enemy.grid_x
+        self.occupants.setdefault(cell, []).append(enemy)
+        self.reservations[enemy.target_y * self.width + enemy.target_x] += 1
+
+    def moved(self, enemy, old_x, old_y):
+        old_cell = old_y * self.width + old_x
+        bucket = self.occupants[old_cell]
+        bucket.remove(enemy)
+        if not bucket:
+            del self.occupants[old_cell]
+        cell = enemy.grid_y * self.width + enemy.grid_x
+        self.occupants.setdefault(cell, []).append(enemy)
+
+    def reserve(self, enemy, x, y):
+        self.reservations[enemy.target_y * self.width + enemy.target_x] -= 1
+        self.reservations[y * self.width + x] += 1
+        enemy.target_x = x
+        enemy.target_y = y
+
+    def is_reserved(self, x, y):
+        return self.reservations[y * self.width + x] > 0
+
+    def enemies_at(self, x, y):
+        return self.occupants.get(y * self.width + x, ())
@@ -0,0 +1,184 @@
+"""Level packs: many pre-built levels in one memory-mapped file
+
+A pack holds a run of consecutive levels for one grid size. The file starts
+with a header and an offset table, followed by one record per level:
+
+    header   magic, version, width, height, first level, level count
+    offsets  count + 1 little-endian uint64 file offsets, one per record
+    record   seed, level, planet, player start, portal, path length,
+             enemy count, obstacle bitmask (one bit per cell, row-major),
+             then x, y and type of every enemy
+
+The file is memory-mapped and LevelPack.layout() only reads the one record
+it needs, so opening a pack costs the same whatever its size and any level
+loads in constant time. Build one from generated levels with
+
+    python -m spacecat.levelpack build campaign.sclp --levels 1-10000 --seed 7
+
+and play it by running game.py with SPACECAT_PACK=campaign.sclp.
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+from .cli import parse_grid, parse_range
+from .constants import GRID_WIDTH, GRID_HEIGHT
+from .levels import LevelLayout, generate_level
+from .swarm import ENEMY_TYPES
+
+
+MAGIC = b"SCLP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHHxxII")
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<QIHHHHHiI")
+ENEMY = struct.Struct("<HHB")
+
+
+def mask_size(width, height):
+    return (width * height + 7) // 8
+
+
+def encode_layout(layout):
+    """One pack record for a LevelLayout"""
+    width = layout.width
+    mask = bytearray(mask_size(width, layout.height))
+    for x, y in layout.obstacles:
+        cell = y * width + x
+        mask[cell >> 3] |= 1 << (cell & 7)
+    parts = [RECORD.pack(layout.seed, layout.level, layout.planet,
+                         *layout.player_start, *layout.portal,
+                         layout.path_length, len(layout.enemies)),
+             bytes(mask)]
+    parts.extend(ENEMY.pack(x, y, ENEMY_TYPES.index(enemy_type))
+                 for x, y, enemy_type in layout.enemies)
+    return b"".join(parts)
+
+
+def write_pack(path, layouts):
+    """Write consecutive levels of one grid size, in level order"""
+    if not layouts:
+        raise ValueError("a level pack needs at least one level")
+    first = layouts[0]
+    for number, layout in enumerate(layouts, first.level):
+        if layout.level != number:
+            raise ValueError(f"level {number} missing from the pack")
+        if (layout.width, layout.height) != (first.width, first.height):
+            raise ValueError(f"level {number} is not {first.width}x{first.height}")
+
+    records = [encode_layout(layout) for layout in layouts]
+    offset = HEADER.size + OFFSET.size * (len(records) + 1)
+    offsets = []
+    for record in records:
+        offsets.append(offset)
+        offset += len(record)
+    offsets.append(offset)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, first.width, first.height,
+                            first.level, len(records)))
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        f.writelines(records)
+
+
+class LevelPack:
+    """Read-only view of a pack file, indexed by level number"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.first_level, self.count = \
+            HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a level pack")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported level pack version {version}")
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, level):
+        return self.first_level <= level < self.first_level + self.count
+
+    @property
+    def levels(self):
+        return range(self.first_level, self.first_level + self.count)
+
+    def layout(self, level):
+        if level not in self:
+            raise KeyError(level)
+        data = self.data
+        offset, = OFFSET.unpack_from(data, HEADER.size + OFFSET.size * (level - self.first_level))
+        (seed, stored_level, planet, start_x, start_y, portal_x, portal_y,
+         path_length, enemy_count) = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+
+        width = self.width
+        size = mask_size(width, self.height)
+        obstacles = []
+        for index, byte in enumerate(data[offset:offset + size]):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        cell = index * 8 + bit
+                        obstacles.append((cell % width, cell // width))
+        offset += size
+
+        enemies = [(x, y, ENEMY_TYPES[type_code])
+                   for x, y, type_code in ENEMY.iter_unpack(
+                       data[offset:offset + ENEMY.size * enemy_count])]
+        return LevelLayout(stored_level, seed, width, self.height, (start_x, start_y),
+                           (portal_x, portal_y), obstacles, enemies, path_length, planet)
+
+    def close(self):
+        self.data.close()
+
+
+def _generate(task):
+    return generate_level(*task)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.levelpack",
+                                     description="Build or inspect level packs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="generate consecutive levels into a pack")
+    build.add_argument("pack")
+    build.add_argument("--levels", default="1-100",
+                       help="first-last level (default %(default)s)")
+    build.add_argument("--seed", type=int, default=1)
+    build.add_argument("--grid", default=f"{GRID_WIDTH}x{GRID_HEIGHT}",
+                       help="WxH grid size (default %(default)s)")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    info = commands.add_parser("info", help="print a pack's header, or one level")
+    info.add_argument("pack")
+    info.add_argument("--level", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        width, height = parse_grid(args.grid)
+        tasks = [(level, args.seed, width, height) for level in parse_range(args.levels)]
+        with multiprocessing.Pool(args.workers) as pool:
+            layouts = pool.map(_generate, tasks, max(1, len(tasks) // (args.workers * 8)))
+        write_pack(args.pack, layouts)
+        print(f"wrote {len(layouts)} levels to {args.pack} "
+              f"({os.path.getsize(args.pack)} bytes)")
+        return 0
+
+    pack = LevelPack(args.pack)
+    print(f"{pack.width}x{pack.height}, levels {pack.first_level}-{pack.levels[-1]}")
+    if args.level is not None:
+        layout = pack.layout(args.level)
+        print(f"level {layout.level}: seed {layout.seed}, planet {layout.planet}, "
+              f"{len(layout.obstacles)} obstacles, {len(layout.enemies)} enemies, "
+              f"path {layout.path_length}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Seeded level generation
+
+A level is fully determined by (level, seed, width, height): every random
+choice comes from a Random seeded with those values, so the same layout can
+be regenerated exactly. Cells are drawn without replacement from the free
+cells, and the portal is checked to be reachable from the player start with a
+BFS, so generation always finishes and never produces an unwinnable map.
+
+Because of that, a LevelPreparer can generate the next level on a background
+thread ahead of time and hand over exactly the layout start_level would have
+made on the spot.
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import PLANET_NAMES
+from .grid import OccupancyGrid, CELL_WALL
+
+
+PLAYER_START = (2, 2)
+SAMPLE_ATTEMPTS = 4
+
+
+class LevelLayout:
+    """Everything start_level needs to set up one level"""
+
+    def __init__(self, level, seed, width, height, player_start, portal,
+                 obstacles, enemies, path_length, planet=None):
+        self.level = level
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.player_start = player_start
+        self.portal = portal
+        self.obstacles = obstacles
+        self.enemies = enemies
+        self.path_length = path_length
+        self.planet = planet_index(level) if planet is None else planet
+
+
+def obstacle_count(level):
+    return 8 + level * 2
+
+
+def enemy_count(level):
+    return 3 + level
+
+
+def planet_index(level):
+    """Index into PLANET_NAMES of the planet a generated level is set on"""
+    return (level - 1) % len(PLANET_NAMES)
+
+
+def level_rng(seed, level):
+    return random.Random(seed * 1000003 + level)
+
+
+def portal_distance(grid, start, portal):
+    distances = grid.distances_from(*start)
+    return distances[portal[1] * grid.width + portal[0]]
+
+
+def shortest_path_cells(grid, start, portal):
+    """Flat indexes of one shortest start-to-portal path, or None"""
+    width = grid.width
+    distances = grid.distances_from(*portal)
+    cell = start[1] * width + start[0]
+    if distances[cell] < 0:
+        return None
+    path = {cell}
+    while distances[cell] > 0:
+        x = cell % width
+        for neighbour, ok in ((cell - width, cell >= width),
+                              (cell + width, cell + width < len(distances)),
+                              (cell - 1, x > 0),
+                              (cell + 1, x < width - 1)):
+            if ok and distances[neighbour] == distances[cell] - 1:
+                cell = neighbour
+                break
+        path.add(cell)
+    return path
+
+
+def place_obstacles(grid, rng, candidates, count, start, portal):
+    """Place up to count obstacles and return the start-to-portal distance
+
+    A few plain samples are tried first; if all of them wall off the portal,
+    obstacles are added one at a time and any that would cut the path off is
+    skipped instead. Only walls landing on the current shortest path can do
+    that, so the BFS is rerun just for those.
+    """
+    for _ in range(SAMPLE_ATTEMPTS):
+        for x, y in rng.sample(candidates, count):
+            grid.add_obstacle(x, y)
+        distance = portal_distance(grid, start, portal)
+        if distance >= 0:
+            return distance
+        grid.clear()
+
+    order = candidates[:]
+    rng.shuffle(order)
+    path = shortest_path_cells(grid, start, portal)
+    for x, y in order:
+        if len(grid.obstacles) == count:
+            break
+        grid.add_obstacle(x, y)
+        if y * grid.width + x in path:
+            new_path = shortest_path_cells(grid, start, portal)
+            if new_path is None:
+                grid.remove_obstacle(x, y)
+            else:
+                path = new_path
+    return len(path) - 1
+
+
+def generate_level(level, seed, width, height, num_obstacles=None,
+                   num_enemies=None):
+    """Lay out a level; the counts default to the level's difficulty curve"""
+    if num_obstacles is None:
+        num_obstacles = obstacle_count(level)
+    if num_enemies is None:
+        num_enemies = enemy_count(level)
+    rng = level_rng(seed, level)
+    grid = OccupancyGrid(width, height)
+    start = PLAYER_START
+    portal = (width - 3, height - 3)
+
+    candidates = [(x, y)
+                  for y in range(1, height - 1)
+                  for x in range(1, width - 1)
+                  if (x, y) != start and (x, y) != portal]
+    count = min(num_obstacles, len(candidates))
+    path_length = place_obstacles(grid, rng, candidates, count, start, portal)
+
+    spawn_cells = [(x, y)
+                   for y in range(3, height - 2)
+                   for x in range(3, width - 2)
+                   if (abs(x - start[0]) + abs(y - start[1])) > 4 and
+                   not grid.flags(x, y) & CELL_WALL]
+    spawns = rng.sample(spawn_cells, min(num_enemies, len(spawn_cells)))
+    enemies = [(x, y, "green" if i % 2 == 0 else "pink")
+               for i, (x, y) in enumerate(spawns)]
+
+    return LevelLayout(level, seed, width, height, start, portal,
+                       list(grid.obstacles), enemies, path_length)
+
+
+class LevelPreparer:
+    """Generates the next level on a background thread
+
+    Only one level is kept in preparation; asking for another one drops it.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="level-preparer")
+        self.key = None
+        self.future = None
+
+    def prepare(self, level, seed, width, height):
+        key = (level, seed, width, height)
+        if key == self.key:
+            return
+        if self.future is not None:
+            self.future.cancel()
+        self.key = key
+        self.future = self.executor.submit(generate_level, *key)
+
+    def take(self, level, seed, width, height):
+        """The prepared layout, waiting if it is still being made, or None"""
+        if (level, seed, width, height) != self.key:
+            return None
+        future = self.future
+        self.key = None
+        self.future = None
+        return future.result()
+
+    def shutdown(self):
+        if self.future is not None:
+            self.future.cancel()
+        self.key = None
+        self.future = None
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,790 @@
+"""Authoritative multiplayer server with delta-compressed snapshots
+
+A TickServer runs numbered Rooms, each a headless Game whose level several
+cats share. Every tick a Room applies the latest input of each cat, moves
+cats and enemies as Game.step does, respawns caught cats at the level start
+and takes everyone to the next level as soon as one cat reaches the portal.
+
+After the tick the Room writes every sprite into one int16 row of a state
+table, MAX_CATS cat slots first and then the level's enemies, and keeps the
+tables of the last HISTORY ticks. A snapshot carries only the rows that
+differ from the tick the client last acknowledged, or all of them when that
+tick is gone or from an earlier level. Clients acknowledging the same tick
+share one encoding, and everything a client gets in a tick goes out in one
+send. Clients build the level itself from the seed and level number, as the
+server does, and interpolate sprite positions between the last two snapshots
+with AnimatedSprite.render_position.
+
+Messages are little-endian and length-prefixed, over TCP or Unix sockets.
+The server disconnects a client that sends anything malformed or oversized
+rather than letting it affect the other rooms:
+
+    python -m spacecat.net serve 127.0.0.1:7777
+    python -m spacecat.net clients 127.0.0.1:7777 --rooms 20 --cats 3
+    python -m spacecat.net bench --rooms 40 --cats 3
+
+bench runs a server and simulated clients in one process over real local
+sockets, checks every decoded snapshot against the server's table and
+reports the tick cost and snapshot sizes.
+"""
+
+import argparse
+import os
+import random
+import selectors
+import socket
+import stat
+import struct
+import sys
+import time
+
+import numpy as np
+
+from .cli import parse_grid
+from .clock import DEFAULT_TICK_RATE, FixedStepClock
+from .constants import (
+    CELL_SIZE, GRID_WIDTH, GRID_HEIGHT, STATE_PLANET_INTRO, STATE_PLAYING,
+    ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, MOVE_ACTIONS,
+)
+from .core import Game, Player, Enemy
+from .grid import OccupancyGrid, CELL_PORTAL
+from .levels import generate_level
+
+
+MAX_CATS = 8
+MAX_ROOMS = 1024
+HISTORY = 64
+NO_BASELINE = 0xFFFFFFFF
+ACTIONS = (None, ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT)
+STATES = (STATE_PLANET_INTRO, STATE_PLAYING)
+
+# Columns of a state table row
+COL_GRID_X = 0
+COL_GRID_Y = 1
+COL_TARGET_X = 2
+COL_TARGET_Y = 3
+COL_X = 4
+COL_Y = 5
+COL_FRAME = 6
+COL_FLAGS = 7
+COLUMNS = 8
+ROW_DTYPE = np.dtype("<i2")
+INDEX_DTYPE = np.dtype("<u2")
+FLAG_PRESENT = 1
+FLAG_MOVING = 2
+# animation_frame runs over [0, ANIMATION_FRAMES) and is sent in steps of 1 / FRAME_STEPS
+FRAME_STEPS = 16
+
+MESSAGE = struct.Struct("<IB")          # payload length, message type
+MSG_JOIN = 1
+MSG_INPUT = 2
+MSG_WELCOME = 3
+MSG_SNAPSHOT = 4
+JOIN = struct.Struct("<H")              # room number
+INPUT = struct.Struct("<IB")            # acknowledged tick, ACTIONS index
+WELCOME = struct.Struct("<BQHHH")       # cat slot, seed, grid width, grid height, tick rate
+SNAPSHOT = struct.Struct("<IIHBBHH")    # tick, baseline, level, planet, state, rows, changed
+MAX_CLIENT_MESSAGE = max(JOIN.size, INPUT.size)
+MAX_BACKLOG = 1 << 20
+
+
+def parse_address(text):
+    """(family, address) for "host:port" (TCP) or a Unix socket path"""
+    host, separator, port = text.rpartition(":")
+    if separator and port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, text
+
+
+def encode_message(kind, payload):
+    return MESSAGE.pack(len(payload), kind) + payload
+
+
+def read_messages(buffer, max_length=None):
+    """Complete (type, payload) messages at the start of buffer, removed from it
+
+    Raises ValueError as soon as a header announces more than max_length bytes.
+    """
+    messages = []
+    offset = 0
+    size = len(buffer)
+    while size - offset >= MESSAGE.size:
+        length, kind = MESSAGE.unpack_from(buffer, offset)
+        if max_length is not None and length > max_length:
+            raise ValueError(f"{length} byte message")
+        end = offset + MESSAGE.size + length
+        if end > size:
+            break
+        messages.append((kind, bytes(buffer[offset + MESSAGE.size:end])))
+        offset = end
+    del buffer[:offset]
+    return messages
+
+
+def sprite_row(sprite):
+    flags = FLAG_PRESENT | FLAG_MOVING if sprite.is_moving else FLAG_PRESENT
+    return (sprite.grid_x, sprite.grid_y, sprite.target_x, sprite.target_y,
+            int(sprite.x), int(sprite.y), int(sprite.animation_frame * FRAME_STEPS), flags)
+
+
+class Room:
+    """One level shared by up to MAX_CATS cats, stepped by the server"""
+
+    def __init__(self, seed, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, swarm=None,
+                 hunters=False, tick_rate=DEFAULT_TICK_RATE, level=1):
+        self.game = Game(seed=seed, grid_width=grid_width, grid_height=grid_height,
+                         swarm=swarm, hunters=hunters)
+        self.dt = 1.0 / tick_rate
+        self.cats = [None] * MAX_CATS
+        self.actions = [None] * MAX_CATS
+        self.caught = 0
+        self.start = None
+        self.history = None
+        self.history_ticks = np.full(HISTORY, -1, dtype=np.int64)
+        self.changed = None
+        self.encoded = {}
+        self.game.level = level
+        self.load_level()
+        self.capture()
+
+    @property
+    def occupied(self):
+        return any(cat is not None for cat in self.cats)
+
+    def join(self):
+        """Add a cat at the level start; returns its slot, or None when full"""
+        for slot, cat in enumerate(self.cats):
+            if cat is None:
+                self.cats[slot] = Player(*self.start)
+                return slot
+        return None
+
+    def leave(self, slot):
+        self.cats[slot] = None
+        self.actions[slot] = None
+
+    def press(self, slot, action):
+        """Queue a move for the next tick; a later one in the same tick wins"""
+        self.actions[slot] = action
+
+    def load_level(self):
+        game = self.game
+        game.start_level()
+        self.start = (game.player.grid_x, game.player.grid_y)
+        for cat in self.cats:
+            if cat is not None:
+                cat.reset(*self.start)
+        rows = MAX_CATS + len(game.enemies)
+        if self.history is None or len(self.history[0]) != rows:
+            self.history = np.zeros((HISTORY, rows, COLUMNS), dtype=ROW_DTYPE)
+            self.changed = np.zeros((rows, COLUMNS), dtype=bool)
+        self.history_ticks.fill(-1)
+
+    def tick(self):
+        game = self.game
+        dt = self.dt
+        if game.state == STATE_PLANET_INTRO:
+            game.planet_intro_timer += dt
+            if game.planet_intro_timer >= 3.0:
+                game.begin_playing()
+        else:
+            grid = game.grid
+            enemies = game.enemies
+            actions = self.actions
+            hunted = None
+            for slot, cat in enumerate(self.cats):
+                if cat is None:
+                    continue
+                action = actions[slot]
+                if action is not None:
+                    dx, dy = MOVE_ACTIONS[action]
+                    cat.move(dx, dy, grid, enemies)
+                    actions[slot] = None
+                cat.update_position(dt)
+                cat.update_animation(dt)
+                if hunted is None:
+                    hunted = cat
+            # Hunters chase the cat in the lowest slot
+            if hunted is not None:
+                game.player = hunted
+            game.update_enemies(dt)
+            self.check_cats()
+        game.tick += 1
+        self.capture()
+
+    def check_cats(self):
+        game = self.game
+        grid = game.grid
+        swarm = game.swarm
+        enemy_index = game.enemy_index
+        reached = False
+        for cat in self.cats:
+            if cat is None:
+                continue
+            x = cat.grid_x
+            y = cat.grid_y
+            if swarm is not None:
+                hit = swarm.any_at(x, y)
+            else:
+                hit = bool(enemy_index.enemies_at(x, y))
+            if hit:
+                cat.reset(*self.start)
+                self.caught += 1
+            elif grid.flags(x, y) & CELL_PORTAL:
+                reached = True
+        if reached:
+            game.level += 1
+            self.load_level()
+
+    def capture(self):
+        """Write this tick's state table into the history"""
+        game = self.game
+        tick = game.tick
+        state = self.history[tick % HISTORY]
+        self.history_ticks[tick % HISTORY] = tick
+        self.encoded.clear()
+
+        for slot, cat in enumerate(self.cats):
+            if cat is None:
+                state[slot] = 0
+            else:
+                state[slot] = sprite_row(cat)
+
+        enemies = state[MAX_CATS:]
+        swarm = game.swarm
+        if swarm is not None:
+            enemies[:, COL_GRID_X] = swarm.grid_x
+            enemies[:, COL_GRID_Y] = swarm.grid_y
+            enemies[:, COL_TARGET_X] = swarm.target_x
+            enemies[:, COL_TARGET_Y] = swarm.target_y
+            enemies[:, COL_X] = swarm.x
+            enemies[:, COL_Y] = swarm.y
+            enemies[:, COL_FRAME] = swarm.animation_frame * FRAME_STEPS
+            enemies[:, COL_FLAGS] = FLAG_PRESENT + FLAG_MOVING * swarm.is_moving
+        elif len(enemies):
+            enemies[:] = [sprite_row(enemy) for enemy in game.enemies]
+
+    def snapshot(self, baseline):
+        """SNAPSHOT message for this tick, against the client's acknowledged tick"""
+        if baseline == NO_BASELINE or self.history_ticks[baseline % HISTORY] != baseline:
+            baseline = NO_BASELINE
+        message = self.encoded.get(baseline)
+        if message is not None:
+            return message
+
+        game = self.game
+        tick = game.tick
+        current = self.history[tick % HISTORY]
+        if baseline == NO_BASELINE:
+            count = len(current)
+            body = current.tobytes()
+        else:
+            changed = self.changed
+            np.not_equal(current, self.history[baseline % HISTORY], out=changed)
+            rows = np.flatnonzero(changed.any(axis=1))
+            count = len(rows)
+            body = rows.astype(INDEX_DTYPE).tobytes() + current[rows].tobytes()
+        header = SNAPSHOT.pack(tick, baseline, game.level, game.planet,
+                               STATES.index(game.state), len(current), count)
+        message = encode_message(MSG_SNAPSHOT, header + body)
+        self.encoded[baseline] = message
+        return message
+
+
+class Connection:
+
+    __slots__ = ("sock", "inbox", "outbox", "room_number", "room", "cat", "ack")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.room_number = None
+        self.room = None
+        self.cat = None
+        self.ack = NO_BASELINE
+
+
+class TickServer:
+    """Steps every occupied Room once per tick and sends each client its snapshot
+
+    Rooms are made on first join, room n playing seed `seed` * 1000003 + n,
+    and dropped when their last cat leaves. A join that would open more than
+    max_rooms rooms is refused by closing the connection. The remaining
+    arguments are passed on to Room.
+    """
+
+    def __init__(self, address, seed=1, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 swarm=None, hunters=False, tick_rate=DEFAULT_TICK_RATE, max_rooms=MAX_ROOMS):
+        self.seed = seed
+        self.max_rooms = max_rooms
+        self.room_options = dict(grid_width=grid_width, grid_height=grid_height,
+                                 swarm=swarm, hunters=hunters, tick_rate=tick_rate)
+        self.tick_rate = tick_rate
+        self.rooms = {}
+        self.connections = []
+        self.ticks = 0
+        self.busy = 0.0
+        self.room_ticks = 0
+        self.slowest = 0.0
+
+        family, bind_address = parse_address(address)
+        self.family = family
+        if family == socket.AF_UNIX:
+            try:
+                if stat.S_ISSOCK(os.stat(bind_address).st_mode):
+                    os.unlink(bind_address)
+            except FileNotFoundError:
+                pass
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(bind_address)
+        self.listener.listen(socket.SOMAXCONN)
+        self.listener.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    @property
+    def address(self):
+        """The bound address, in the form parse_address reads"""
+        name = self.listener.getsockname()
+        if self.family == socket.AF_UNIX:
+            return name
+        return f"{name[0]}:{name[1]}"
+
+    def room(self, number):
+        """The Room numbered `number`, made if needed; None if max_rooms are open"""
+        room = self.rooms.get(number)
+        if room is None:
+            if len(self.rooms) >= self.max_rooms:
+                return None
+            room = Room(self.seed * 1000003 + number, **self.room_options)
+            self.rooms[number] = room
+        return room
+
+    def serve(self, seconds=None):
+        """Run ticks in real time, reading input in between, for `seconds` or forever"""
+        clock = FixedStepClock(self.tick_rate)
+        last = started = time.perf_counter()
+        while seconds is None or last - started < seconds:
+            self.poll(max(0.0, clock.step - clock.accumulator - (time.perf_counter() - last)))
+            now = time.perf_counter()
+            for _ in range(clock.advance(now - last)):
+                self.tick()
+            last = now
+
+    def poll(self, timeout=0):
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            else:
+                self.receive(key.data)
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = Connection(sock)
+        self.connections.append(connection)
+        self.selector.register(sock, selectors.EVENT_READ, connection)
+
+    def receive(self, connection):
+        try:
+            data = connection.sock.recv(1 << 16)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(connection)
+            return
+        connection.inbox += data
+        try:
+            messages = read_messages(connection.inbox, MAX_CLIENT_MESSAGE)
+        except ValueError:
+            self.drop(connection)
+            return
+        for kind, payload in messages:
+            if not self.handle(connection, kind, payload):
+                self.drop(connection)
+                return
+
+    def handle(self, connection, kind, payload):
+        """Act on one client message; False if it breaks the protocol"""
+        if kind == MSG_INPUT:
+            if connection.room is None or len(payload) != INPUT.size:
+                return False
+            ack, action = INPUT.unpack(payload)
+            if action >= len(ACTIONS):
+                return False
+            connection.ack = ack
+            if action:
+                connection.room.press(connection.cat, ACTIONS[action])
+            return True
+        if kind == MSG_JOIN:
+            if connection.room is not None or len(payload) != JOIN.size:
+                return False
+            number = JOIN.unpack(payload)[0]
+            room = self.room(number)
+            if room is None:
+                return False
+            cat = room.join()
+            if cat is None:
+                return False
+            connection.room_number = number
+            connection.room = room
+            connection.cat = cat
+            game = room.game
+            connection.outbox += encode_message(MSG_WELCOME, WELCOME.pack(
+                cat, game.seed, game.grid.width, game.grid.height, self.tick_rate))
+            return True
+        return False
+
+    def tick(self):
+        started = time.perf_counter()
+        for room in self.rooms.values():
+            if room.occupied:
+                room.tick()
+                self.room_ticks += 1
+        for connection in tuple(self.connections):
+            if connection.room is not None:
+                connection.outbox += connection.room.snapshot(connection.ack)
+            self.flush(connection)
+        elapsed = time.perf_counter() - started
+        self.ticks += 1
+        self.busy += elapsed
+        self.slowest = max(self.slowest, elapsed)
+
+    def flush(self, connection):
+        outbox = connection.outbox
+        if not outbox:
+            return
+        try:
+            sent = connection.sock.send(outbox)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self.drop(connection)
+            return
+        del outbox[:sent]
+        if len(outbox) > MAX_BACKLOG:
+            self.drop(connection)
+
+    def drop(self, connection):
+        room = connection.room
+        if room is not None:
+            room.leave(connection.cat)
+            if not room.occupied:
+                del self.rooms[connection.room_number]
+            connection.room = None
+        self.selector.unregister(connection.sock)
+        connection.sock.close()
+        self.connections.remove(connection)
+
+    def close(self):
+        for connection in tuple(self.connections):
+            self.drop(connection)
+        self.selector.unregister(self.listener)
+        address = self.address
+        self.listener.close()
+        self.selector.close()
+        if self.family == socket.AF_UNIX:
+            os.unlink(address)
+
+    def report(self):
+        if not self.ticks:
+            return "no ticks run"
+        per_room = self.busy / max(1, self.room_ticks)
+        return (f"{self.ticks} ticks, {self.busy / self.ticks * 1000:.3f} ms mean, "
+                f"{self.slowest * 1000:.3f} ms slowest, {per_room * 1e6:.0f} us per room tick, "
+                f"~{1.0 / self.tick_rate / per_room:.0f} rooms per core at {self.tick_rate} Hz")
+
+
+class Client:
+    """A connection to a TickServer, mirroring one room from its snapshots
+
+    `cats` holds a Player per slot, with `present` saying which are in the
+    room, and `enemies` an Enemy per enemy of the level; `sprites` is both
+    in state table order. Draw them at render_position(alpha()).
+    """
+
+    def __init__(self, address, room=0):
+        family, connect_address = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(connect_address)
+        self.sock.setblocking(False)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.inbox = bytearray()
+        self.room = room
+        self.cat = None
+        self.seed = None
+        self.grid_width = None
+        self.grid_height = None
+        self.tick_rate = DEFAULT_TICK_RATE
+        self.tick = None
+        self.ack = NO_BASELINE
+        self.level = None
+        self.planet = 0
+        self.state = None
+        self.layout = None
+        self.grid = None
+        self.history = None
+        self.history_ticks = np.full(HISTORY, -1, dtype=np.int64)
+        self.cats = [Player(0, 0) for _ in range(MAX_CATS)]
+        self.present = [False] * MAX_CATS
+        self.enemies = []
+        self.sprites = []
+        self.moved = []
+        self.received_at = 0.0
+        self.snapshots = 0
+        self.full_snapshots = 0
+        self.snapshot_bytes = 0
+        self.send(MSG_JOIN, JOIN.pack(room))
+
+    @property
+    def player(self):
+        return None if self.cat is None else self.cats[self.cat]
+
+    def send(self, kind, payload):
+        self.sock.sendall(encode_message(kind, payload))
+
+    def send_input(self, action=None):
+        """Send a move, or None to only acknowledge the latest snapshot"""
+        self.send(MSG_INPUT, INPUT.pack(self.ack, ACTIONS.index(action)))
+
+    def alpha(self, now=None):
+        """How far to interpolate from the previous snapshot to the latest"""
+        if now is None:
+            now = time.perf_counter()
+        return min(1.0, (now - self.received_at) * self.tick_rate)
+
+    def poll(self):
+        """Apply whatever has arrived; returns the number of snapshots applied"""
+        while True:
+            try:
+                data = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.inbox += data
+        applied = 0
+        for kind, payload in read_messages(self.inbox):
+            if kind == MSG_SNAPSHOT:
+                self.apply(payload)
+                applied += 1
+            elif kind == MSG_WELCOME:
+                (self.cat, self.seed, self.grid_width, self.grid_height,
+                 self.tick_rate) = WELCOME.unpack(payload)
+        return applied
+
+    def load_level(self, level, rows):
+        layout = generate_level(level, self.seed, self.grid_width, self.grid_height)
+        if MAX_CATS + len(layout.enemies) != rows:
+            raise ValueError(f"level {level} does not match the server's")
+        self.level = level
+        self.layout = layout
+        self.grid = OccupancyGrid(self.grid_width, self.grid_height)
+        for x, y in layout.obstacles:
+            self.grid.add_obstacle(x, y)
+        self.grid.mark(*layout.portal, CELL_PORTAL)
+        self.enemies = [Enemy(x, y, enemy_type) for x, y, enemy_type in layout.enemies]
+        self.sprites = self.cats + self.enemies
+        self.moved = []
+        self.history = np.zeros((HISTORY, rows, COLUMNS), dtype=ROW_DTYPE)
+        self.history_ticks.fill(-1)
+
+    def apply(self, payload):
+        tick, baseline, level, planet, state, rows, count = SNAPSHOT.unpack_from(payload)
+        if level != self.level:
+            self.load_level(level, rows)
+        current = self.history[tick % HISTORY]
+        if baseline == NO_BASELINE:
+            current[:] = np.frombuffer(payload, ROW_DTYPE, rows * COLUMNS,
+                                       SNAPSHOT.size).reshape(rows, COLUMNS)
+            changed = range(rows)
+            self.full_snapshots += 1
+        else:
+            if self.history_ticks[baseline % HISTORY] != baseline:
+                raise ValueError(f"snapshot {tick} is against unknown tick {baseline}")
+            current[:] = self.history[baseline % HISTORY]
+            changed = np.frombuffer(payload, INDEX_DTYPE, count, SNAPSHOT.size)
+            current[changed] = np.frombuffer(
+                payload, ROW_DTYPE, count * COLUMNS,
+                SNAPSHOT.size + count * INDEX_DTYPE.itemsize).reshape(count, COLUMNS)
+            changed = changed.tolist()
+        self.history_ticks[tick % HISTORY] = tick
+        self.tick = tick
+        self.ack = tick
+        self.planet = planet
+        self.state = STATES[state]
+        self.update_sprites(current, changed)
+        self.received_at = time.perf_counter()
+        self.snapshots += 1
+        self.snapshot_bytes += MESSAGE.size + len(payload)
+
+    def update_sprites(self, state, changed):
+        """Move the changed rows' sprites on, keeping where they were for interpolation"""
+        for sprite in self.moved:
+            sprite.prev_x = sprite.x
+            sprite.prev_y = sprite.y
+        sprites = self.sprites
+        moved = []
+        for row in changed:
+            (grid_x, grid_y, target_x, target_y, x, y, frame,
+             flags) = state[row].tolist()
+            sprite = sprites[row]
+            if row < MAX_CATS:
+                self.present[row] = bool(flags & FLAG_PRESENT)
+            # Respawns and first sightings jump instead of sliding across the map
+            if abs(x - sprite.x) + abs(y - sprite.y) > CELL_SIZE:
+                sprite.prev_x = x
+                sprite.prev_y = y
+            else:
+                sprite.prev_x = sprite.x
+                sprite.prev_y = sprite.y
+            sprite.grid_x = grid_x
+            sprite.grid_y = grid_y
+            sprite.target_x = target_x
+            sprite.target_y = target_y
+            sprite.x = x
+            sprite.y = y
+            sprite.animation_frame = frame / FRAME_STEPS
+            sprite.is_moving = bool(flags & FLAG_MOVING)
+            moved.append(sprite)
+        self.moved = moved
+
+    def close(self):
+        self.sock.close()
+
+
+class SimulatedClient(Client):
+    """A Client that walks its cat to the portal, with some random steps"""
+
+    def __init__(self, address, room=0, seed=None, wander=0.2):
+        super().__init__(address, room)
+        self.rng = random.Random(seed)
+        self.wander = wander
+        self.distances = None
+        self.distances_level = None
+
+    def act(self):
+        """Send this tick's input: a move when the cat is still, else just an ack"""
+        cat = self.player
+        if cat is None or self.state != STATE_PLAYING or cat.is_moving:
+            self.send_input()
+            return
+        if self.distances_level != self.level:
+            self.distances = self.grid.distances_from(*self.layout.portal)
+            self.distances_level = self.level
+        action = self.rng.choice(ACTIONS[1:])
+        if self.rng.random() >= self.wander:
+            grid = self.grid
+            distances = self.distances
+            here = distances[cat.grid_y * grid.width + cat.grid_x]
+            for move in ACTIONS[1:]:
+                dx, dy = MOVE_ACTIONS[move]
+                x = cat.grid_x + dx
+                y = cat.grid_y + dy
+                if grid.in_bounds(x, y) and distances[y * grid.width + x] == here - 1:
+                    action = move
+                    break
+        self.send_input(action)
+
+
+def make_clients(address, rooms, cats, seed):
+    return [SimulatedClient(address, room, seed * 1000003 + room * MAX_CATS + cat)
+            for room in range(rooms) for cat in range(cats)]
+
+
+def client_report(clients, seconds):
+    snapshots = sum(client.snapshots for client in clients)
+    full = sum(client.full_snapshots for client in clients)
+    received = sum(client.snapshot_bytes for client in clients)
+    levels = max((client.level or 0) for client in clients)
+    return (f"{len(clients)} clients, {snapshots} snapshots ({full} full), "
+            f"{received / max(1, snapshots):.0f} bytes per snapshot, "
+            f"{received / seconds / 1024:.0f} KiB/s in total, highest level {levels}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.net",
+                                     description="Multiplayer tick server and simulated clients")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run a tick server")
+    serve.add_argument("address", help="host:port or a Unix socket path")
+    clients = commands.add_parser("clients", help="connect simulated clients to a server")
+    clients.add_argument("address")
+    bench = commands.add_parser("bench",
+                                help="run a server and simulated clients in this process")
+    bench.add_argument("--address", default="127.0.0.1:0")
+    for command in (serve, bench):
+        command.add_argument("--grid", default=f"{GRID_WIDTH}x{GRID_HEIGHT}",
+                             help="WxH grid size (default %(default)s)")
+        command.add_argument("--hunters", action="store_true",
+                             help="enemies chase the cat in the lowest slot")
+        command.add_argument("--tick-rate", type=int, default=DEFAULT_TICK_RATE)
+    for command in (clients, bench):
+        command.add_argument("--rooms", type=int, default=20)
+        command.add_argument("--cats", type=int, default=3, help="clients per room")
+        command.add_argument("--seconds", type=float, default=10.0)
+    for command in (serve, clients, bench):
+        command.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == "clients":
+        players = make_clients(args.address, args.rooms, args.cats, args.seed)
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.seconds:
+            for player in players:
+                player.poll()
+                player.act()
+            time.sleep(1.0 / players[0].tick_rate)
+        print(client_report(players, args.seconds))
+        return 0
+
+    width, height = parse_grid(args.grid)
+    server = TickServer(args.address, args.seed, width, height, hunters=args.hunters,
+                        tick_rate=args.tick_rate)
+    if args.command == "serve":
+        print(f"serving on {server.address}", file=sys.stderr)
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(server.report(), file=sys.stderr)
+            server.close()
+        return 0
+
+    players = make_clients(server.address, args.rooms, args.cats, args.seed)
+    mismatches = 0
+    ticks = int(args.seconds * args.tick_rate)
+    for _ in range(ticks):
+        server.poll()
+        server.tick()
+        for player in players:
+            if player.poll() and player.cat is not None:
+                room = server.rooms[player.room]
+                slot = player.tick % HISTORY
+                if not np.array_equal(player.history[slot], room.history[slot]):
+                    mismatches += 1
+            player.act()
+    print(server.report())
+    print(client_report(players, args.seconds))
+    print(f"{sum(room.caught for room in server.rooms.values())} cats caught, "
+          f"{mismatches} snapshots decoded differently from the server")
+    for player in players:
+        player.close()
+    server.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
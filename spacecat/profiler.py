@@ -0,0 +1,164 @@
+"""Per-phase frame timing kept in fixed-size ring buffers
+
+Code under measurement wraps each phase in `with profiler.section(name):`.
+Time spent in a phase is summed over the frame (several logic ticks can run in
+one frame) and written to that phase's ring when end_frame() is called, along
+with the whole frame's wall time under FRAME_PHASE. Game and Renderer default
+to NULL_PROFILER, whose sections do nothing.
+
+StartupTimer measures the one-off phases before the first frame instead.
+"""
+
+import csv
+import json
+import time
+from array import array
+
+
+FRAME_PHASE = "frame"
+DEFAULT_CAPACITY = 600
+
+
+def percentile(sorted_samples, fraction):
+    """The sample at `fraction` (0 to 1) of the way through sorted_samples"""
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class _Section:
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class _NullSection:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullProfiler:
+    """Stand-in used when nothing is being measured"""
+
+    _section = _NullSection()
+
+    def section(self, name):
+        return self._section
+
+    def end_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.rings = {FRAME_PHASE: array("d", bytes(8 * capacity))}
+        self.sections = {}
+        self.current = {}
+        self.frames = 0
+        self.frame_start = time.perf_counter()
+
+    def section(self, name):
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = _Section(self, name)
+            self.rings[name] = array("d", bytes(8 * self.capacity))
+        return section
+
+    def end_frame(self):
+        now = time.perf_counter()
+        slot = self.frames % self.capacity
+        current = self.current
+        for name, ring in self.rings.items():
+            ring[slot] = current.get(name, 0.0)
+        self.rings[FRAME_PHASE][slot] = now - self.frame_start
+        current.clear()
+        self.frame_start = now
+        self.frames += 1
+
+    def recent(self, name):
+        """Samples of a phase in seconds, oldest first"""
+        ring = self.rings[name]
+        count = min(self.frames, self.capacity)
+        start = self.frames % self.capacity if self.frames > self.capacity else 0
+        return [ring[(start + i) % self.capacity] for i in range(count)]
+
+    def percentiles(self, name, fractions=(0.50, 0.95, 0.99)):
+        samples = sorted(self.recent(name))
+        if not samples:
+            return tuple(0.0 for _ in fractions)
+        return tuple(percentile(samples, f) for f in fractions)
+
+    def summary(self):
+        """{phase: (p50, p95, p99)} in milliseconds"""
+        return {name: tuple(value * 1000 for value in self.percentiles(name))
+                for name in self.rings}
+
+    def export_json(self, path):
+        report = {"frames": self.frames, "capacity": self.capacity, "phases": {}}
+        for name, (p50, p95, p99) in self.summary().items():
+            report["phases"][name] = {
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "samples_ms": [sample * 1000 for sample in self.recent(name)],
+            }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    def export_csv(self, path):
+        names = list(self.rings)
+        columns = [self.recent(name) for name in names]
+        first_frame = self.frames - len(columns[0])
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + [name + "_ms" for name in names])
+            for row, values in enumerate(zip(*columns)):
+                writer.writerow([first_frame + row] + [f"{value * 1000:.4f}" for value in values])
+
+    def export(self, path):
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+
+class StartupTimer:
+    """Wall time of each startup phase, each ending where mark() is called"""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        lines = [f"{name:20} {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':20} {(self.last - self.start) * 1000:8.1f} ms")
+        return "\n".join(lines)
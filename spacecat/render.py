@@ -0,0 +1,812 @@
+"""Drawing for the pgzero frontend, and the surfaces it reuses across frames"""
+
+import math
+import os
+import time
+from collections import OrderedDict
+
+import pygame
+from pgzero import ptext
+from pgzero.screen import Screen
+
+from .constants import (
+    WIDTH, HEIGHT, CELL_SIZE, PLANET_NAMES, SOUND_BUTTON_POS, QUIT_BUTTON_POS,
+    STATE_MENU, STATE_PLAYING, STATE_GAME_OVER, STATE_LEVEL_COMPLETE,
+    STATE_PLANET_INTRO, ANIMATION_FRAMES,
+)
+from .core import Game
+from .grid import CELL_WALL
+from .profiler import NULL_PROFILER, FRAME_PHASE
+from .swarm import ENEMY_TYPES
+
+
+PLANET_COLORS = [
+    (30, 20, 60),   
+    (60, 30, 20),   
+    (20, 60, 60),   
+    (60, 60, 20),  
+]
+
+
+SPRITE_BOX = 80
+SPRITE_COLORKEY = (255, 0, 255)
+ANIMATION_PHASES = 8
+
+
+CHUNK_CELLS = 8
+CHUNK_PIXELS = CHUNK_CELLS * CELL_SIZE
+CHUNK_EVICT_MARGIN = 2
+INTRO_CHUNKS_PER_FRAME = 2
+QUALITY_LOW = 0
+QUALITY_MEDIUM = 1
+QUALITY_HIGH = 2
+QUALITY_NAMES = ("low", "medium", "high")
+INTRO_STARS = (25, 50, 100)
+HELP_TEXT = "WASD/ARROWS: Move | M: Mute"
+
+
+TEXT_ANCHORS = {
+    "topleft": (0, 0),
+    "topright": (1, 0),
+    "center": (0.5, 0.5),
+    "bottomleft": (0, 1),
+}
+
+
+def planet_color(level):
+    return PLANET_COLORS[(level - 1) % len(PLANET_COLORS)]
+
+
+def init_offscreen():
+    """Make pygame usable for offscreen drawing when no window is open
+
+    Text rendering converts surfaces to the display format, so a 1x1 display
+    on SDL's dummy driver is opened if there is no display yet.
+    """
+    pygame.font.init()
+    if pygame.display.get_surface() is None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+
+def new_surface(size):
+    surface = pygame.Surface(size)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    return surface
+
+
+class Camera:
+    """Top-left world pixel shown at the window's top-left corner
+
+    follow() centres the view on a point but stops at the world's edges, so
+    a world no bigger than the window is drawn exactly where it used to be.
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    def follow(self, x, y, world_width, world_height):
+        self.x = min(max(round(x) - self.width // 2, 0), max(world_width - self.width, 0))
+        self.y = min(max(round(y) - self.height // 2, 0), max(world_height - self.height, 0))
+
+    def bounds(self, margin=0):
+        """(left, top, right, bottom) of the view in world pixels"""
+        return (self.x - margin, self.y - margin,
+                self.x + self.width + margin, self.y + self.height + margin)
+
+    def sees(self, x, y, margin=0):
+        return (self.x - margin <= x < self.x + self.width + margin and
+                self.y - margin <= y < self.y + self.height + margin)
+
+
+class StaticLayer:
+    """Background, stars, grid lines and obstacles of a level, in chunks
+
+    The world is cut into CHUNK_CELLS x CHUNK_CELLS cell chunks that are
+    rendered the first time they come into view and blitted from then on.
+    Chunks more than CHUNK_EVICT_MARGIN chunks outside the view are dropped,
+    and all of them are when the level, the planet colour or the obstacle set
+    changes.
+    """
+
+    def __init__(self, profiler=NULL_PROFILER):
+        self.chunks = {}
+        self.key = None
+        self.profiler = profiler
+
+    def invalidate(self):
+        self.key = None
+        self.chunks.clear()
+
+    def prepare(self, game, camera=None, limit=None):
+        """Drop stale chunks, and render the ones camera can see
+
+        With `limit`, at most that many missing chunks are rendered per call.
+        """
+        key = (game.level, planet_color(game.level), id(game.grid),
+               game.grid.version)
+        if key != self.key:
+            self.chunks.clear()
+            self.key = key
+        if camera is not None:
+            for chunk_x, chunk_y in self.visible_chunks(game, camera):
+                if limit is not None and (chunk_x, chunk_y) not in self.chunks:
+                    if limit == 0:
+                        break
+                    limit -= 1
+                self.chunk(game, chunk_x, chunk_y)
+
+    def visible_chunks(self, game, camera):
+        left, top, right, bottom = camera.bounds()
+        last_x = (min(right, game.grid.width * CELL_SIZE) - 1) // CHUNK_PIXELS
+        last_y = (min(bottom, game.grid.height * CELL_SIZE) - 1) // CHUNK_PIXELS
+        for chunk_y in range(top // CHUNK_PIXELS, last_y + 1):
+            for chunk_x in range(left // CHUNK_PIXELS, last_x + 1):
+                yield chunk_x, chunk_y
+
+    def chunk(self, game, chunk_x, chunk_y):
+        surface = self.chunks.get((chunk_x, chunk_y))
+        if surface is None:
+            surface = self.chunks[chunk_x, chunk_y] = self.render(game, chunk_x, chunk_y)
+        return surface
+
+    def draw(self, screen, game, camera):
+        self.prepare(game)
+        world_width = game.grid.width * CELL_SIZE
+        world_height = game.grid.height * CELL_SIZE
+        if world_width < camera.width or world_height < camera.height:
+            screen.fill(planet_color(game.level))
+        
+        blits = []
+        for chunk_x, chunk_y in self.visible_chunks(game, camera):
+            blits.append((self.chunk(game, chunk_x, chunk_y),
+                          (chunk_x * CHUNK_PIXELS - camera.x, chunk_y * CHUNK_PIXELS - camera.y)))
+        screen.surface.blits(blits, False)
+        self.evict(camera)
+
+    def evict(self, camera):
+        left, top, right, bottom = camera.bounds(CHUNK_EVICT_MARGIN * CHUNK_PIXELS)
+        for chunk_x, chunk_y in list(self.chunks):
+            x = chunk_x * CHUNK_PIXELS
+            y = chunk_y * CHUNK_PIXELS
+            if x >= right or y >= bottom or x + CHUNK_PIXELS <= left or y + CHUNK_PIXELS <= top:
+                del self.chunks[chunk_x, chunk_y]
+
+    def render(self, game, chunk_x, chunk_y):
+        grid = game.grid
+        first_x = chunk_x * CHUNK_CELLS
+        first_y = chunk_y * CHUNK_CELLS
+        last_x = min(first_x + CHUNK_CELLS, grid.width)
+        last_y = min(first_y + CHUNK_CELLS, grid.height)
+        origin_x = first_x * CELL_SIZE
+        origin_y = first_y * CELL_SIZE
+        width = (last_x - first_x) * CELL_SIZE
+        height = (last_y - first_y) * CELL_SIZE
+        layer = Screen(new_surface((width, height)))
+        profiler = self.profiler
+        
+        with profiler.section("background"):
+            layer.fill(planet_color(game.level))
+            
+            # The star pattern repeats every window-sized tile of the world;
+            # stars of neighbouring chunks can reach one pixel into this one
+            world_width = grid.width * CELL_SIZE
+            world_height = grid.height * CELL_SIZE
+            for tile_y in range(max(origin_y - 1, 0) // HEIGHT, (origin_y + height) // HEIGHT + 1):
+                for tile_x in range(max(origin_x - 1, 0) // WIDTH, (origin_x + width) // WIDTH + 1):
+                    for i in range(40):
+                        star_x = tile_x * WIDTH + (i * 43 + game.level * 17) % WIDTH
+                        star_y = tile_y * HEIGHT + (i * 67) % HEIGHT
+                        x = star_x - origin_x
+                        y = star_y - origin_y
+                        if (star_x < world_width and star_y < world_height and
+                            -1 <= x <= width and -1 <= y <= height):
+                            layer.draw.filled_circle((x, y), 1, (255, 255, 255))
+        
+        with profiler.section("grid"):
+            for i in range(last_x - first_x + 1):
+                x = i * CELL_SIZE
+                layer.draw.line((x, 0), (x, height), (255, 255, 255, 30))
+            for i in range(last_y - first_y + 1):
+                y = i * CELL_SIZE
+                layer.draw.line((0, y), (width, y), (255, 255, 255, 30))
+        
+        with profiler.section("obstacles"):
+            cells = grid.cells
+            for obs_y in range(first_y, last_y):
+                row = obs_y * grid.width
+                for obs_x in range(first_x, last_x):
+                    if cells[row + obs_x] & CELL_WALL:
+                        x = obs_x * CELL_SIZE + CELL_SIZE // 2 - origin_x
+                        y = obs_y * CELL_SIZE + CELL_SIZE // 2 - origin_y
+                        layer.draw.filled_circle((x, y), 18, (80, 80, 80))
+                        layer.draw.filled_circle((x - 5, y - 5), 4, (100, 100, 100))
+        
+        return layer.surface
+
+
+class SpriteCache:
+    """Rasterised sprite frames keyed by appearance and animation state
+
+    animation_frame is quantised to 1/ANIMATION_PHASES so each sprite only
+    has ANIMATION_FRAMES * ANIMATION_PHASES phases, moving or not. Frames are
+    drawn on first use and the least recently used ones are dropped once
+    max_size is reached. Clearing `detailed` switches to the sprites'
+    simplified look.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.frames = OrderedDict()
+        self.detailed = True
+
+    def frame(self, sprite):
+        return self.frame_at(sprite, int(sprite.animation_frame * ANIMATION_PHASES),
+                             sprite.is_moving)
+
+    def frame_at(self, sprite, phase, is_moving, detailed=None):
+        if detailed is None:
+            detailed = self.detailed
+        key = (sprite.appearance, phase, is_moving, detailed)
+        surface = self.frames.get(key)
+        if surface is not None:
+            self.frames.move_to_end(key)
+            return surface
+        
+        surface = new_surface((SPRITE_BOX, SPRITE_BOX))
+        surface.fill(SPRITE_COLORKEY)
+        surface.set_colorkey(SPRITE_COLORKEY, pygame.RLEACCEL)
+        center = SPRITE_BOX // 2
+        sprite.draw_at(Screen(surface), center, center,
+                       phase / ANIMATION_PHASES, is_moving, detailed)
+        
+        self.frames[key] = surface
+        if len(self.frames) > self.max_size:
+            self.frames.popitem(last=False)
+        return surface
+
+    def draw(self, screen, sprite, alpha=1.0, camera=None):
+        """Blit sprite's current frame; off-camera sprites are skipped"""
+        half = SPRITE_BOX // 2
+        x, y = sprite.render_position(alpha)
+        if camera is not None:
+            if not camera.sees(x, y, half):
+                return
+            x -= camera.x
+            y -= camera.y
+        screen.blit(self.frame(sprite), (round(x) - half, round(y) - half))
+
+    def draw_swarm(self, screen, swarm, alpha=1.0, camera=None):
+        """Draw the enemies of a Swarm that camera can see in one blits() call"""
+        half = SPRITE_BOX // 2
+        offset_x = offset_y = 0
+        bounds = None
+        if camera is not None:
+            offset_x = camera.x
+            offset_y = camera.y
+            bounds = camera.bounds(half)
+        xs, ys, phases, moving, types = swarm.render_state(alpha, ANIMATION_PHASES, bounds)
+        prototypes = [swarm.prototypes[enemy_type] for enemy_type in ENEMY_TYPES]
+        frame_at = self.frame_at
+        screen.surface.blits([(frame_at(prototypes[types[i]], phases[i], moving[i]),
+                               (round(xs[i]) - offset_x - half, round(ys[i]) - offset_y - half))
+                              for i in range(len(xs))], False)
+
+
+class TextCache:
+    """Rendered text surfaces keyed on string, font size, colour and alpha
+
+    Colours are rounded to whole channel values so animated colours share
+    entries. Glow text is composed into a single surface with its passes
+    already stacked. The least recently used surfaces are dropped once
+    max_size is reached.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def _remember(self, key, surface):
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def surface(self, text, fontsize, color, alpha=1.0):
+        color = tuple(int(round(c)) for c in color)
+        key = ("text", text, fontsize, color, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = ptext.getsurf(text, fontsize=fontsize, color=color,
+                                alpha=alpha, cache=False)
+        return self._remember(key, surface)
+
+    def glow_surface(self, text, fontsize, color, glow_color, offsets):
+        """Glow passes at the given y offsets with the text drawn on top"""
+        color = tuple(int(round(c)) for c in color)
+        glow_color = tuple(int(round(c)) for c in glow_color)
+        key = ("glow", text, fontsize, color, glow_color, tuple(offsets))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        glow = self.surface(text, fontsize, glow_color)
+        top = self.surface(text, fontsize, color)
+        width, height = top.get_size()
+        surface = pygame.Surface((width, height + max(offsets, default=0)),
+                                 pygame.SRCALPHA)
+        for offset in offsets:
+            surface.blit(glow, (0, offset))
+        surface.blit(top, (0, 0))
+        return self._remember(key, surface)
+
+    def draw(self, screen, text, fontsize, color, alpha=1.0, **anchor):
+        surface = self.surface(text, fontsize, color, alpha)
+        blit_anchored(screen, surface, surface.get_size(), **anchor)
+
+    def draw_glow(self, screen, text, fontsize, color, glow_color, offsets, **anchor):
+        surface = self.glow_surface(text, fontsize, color, glow_color, offsets)
+        blit_anchored(screen, surface, self.surface(text, fontsize, color).get_size(),
+                      **anchor)
+
+    def rect(self, text, fontsize, color, alpha=1.0, **anchor):
+        """Screen area draw() would cover"""
+        size = self.surface(text, fontsize, color, alpha).get_size()
+        return pygame.Rect(anchored_position(size, **anchor), size)
+
+    def glow_rect(self, text, fontsize, color, glow_color, offsets, **anchor):
+        """Screen area draw_glow() would cover"""
+        surface = self.glow_surface(text, fontsize, color, glow_color, offsets)
+        position = anchored_position(self.surface(text, fontsize, color).get_size(), **anchor)
+        return pygame.Rect(position, surface.get_size())
+
+
+def anchored_position(size, **anchor):
+    """Top-left corner of a box of `size` anchored at the given point, as ptext does"""
+    (name, (x, y)), = anchor.items()
+    hanchor, vanchor = TEXT_ANCHORS[name]
+    width, height = size
+    return (int(round(x - hanchor * width)), int(round(y - vanchor * height)))
+
+
+def blit_anchored(screen, surface, size, **anchor):
+    """Blit like ptext does, anchoring a box of `size` at the given point"""
+    screen.blit(surface, anchored_position(size, **anchor))
+
+
+class DirtyRegions:
+    """Updates a kept frame by redrawing only what changed since the last one
+
+    A screen is described every frame as a back-to-front list of items
+    (item_id, key, rect, draw, args), where key captures how the item looks
+    and draw(screen, *args) paints it. Items whose key or rect changed, that
+    appeared or that went away mark their old and new rects dirty; each dirty area is
+    cleared to the background colour and every item overlapping it is redrawn
+    clipped to the area. The first frame, and the first after invalidate(),
+    is drawn in full.
+    """
+
+    def __init__(self):
+        self.previous = None
+
+    def invalidate(self):
+        self.previous = None
+
+    def draw(self, screen, background, items):
+        """Bring the screen up to date with items; return the rects redrawn"""
+        current = {item[0]: (item[1], item[2]) for item in items}
+        previous = self.previous
+        self.previous = current
+        if previous is None:
+            screen.fill(background)
+            for item in items:
+                item[3](screen, *item[4])
+            return [screen.surface.get_rect()]
+        
+        dirty = []
+        for item_id, state in current.items():
+            old = previous.pop(item_id, None)
+            if old != state:
+                dirty.append(state[1])
+                if old is not None and old[1] != state[1]:
+                    dirty.append(old[1])
+        dirty.extend(rect for _, rect in previous.values())
+        if not dirty:
+            return dirty
+        
+        rects = [item[2] for item in items]
+        surface = screen.surface
+        for area in dirty:
+            surface.set_clip(area)
+            surface.fill(background, area)
+            for index in area.collidelistall(rects):
+                item = items[index]
+                item[3](screen, *item[4])
+        surface.set_clip(None)
+        return dirty
+
+
+def star_rect(pos, radius):
+    x, y = pos
+    return pygame.Rect(x - radius - 1, y - radius - 1, 2 * radius + 3, 2 * radius + 3)
+
+
+def draw_star(screen, pos, radius, color):
+    screen.draw.filled_circle(pos, radius, color)
+
+
+class Renderer:
+    """Draws each game state onto a pgzero Screen, window or offscreen"""
+
+    def __init__(self, profiler=NULL_PROFILER):
+        self.profiler = profiler
+        self.static_layer = StaticLayer(profiler)
+        self.camera = Camera()
+        self.sprite_cache = SpriteCache()
+        self.text_cache = TextCache()
+        self.menu_regions = DirtyRegions()
+        self.menu_state = None
+        self.intro_regions = DirtyRegions()
+        self.intro_stars = (None, [])
+        self.screen_owner = None
+        self.warm_up_steps = None
+        self.warm_up_seconds = 0.0
+        self.warmed_up = False
+        self.quality = QUALITY_HIGH
+
+    def claim_screen(self, screen, owner):
+        """Note who draws this frame; True if they also drew the last one"""
+        kept = self.screen_owner == (owner, screen.surface)
+        self.screen_owner = (owner, screen.surface)
+        return kept
+
+    def invalidate(self):
+        """Forget what is on screen, e.g. after something else drew over it"""
+        self.screen_owner = None
+
+    def set_quality(self, quality):
+        """Pick a QUALITY_* detail tier; sprites are simplified at QUALITY_LOW"""
+        self.quality = quality
+        self.sprite_cache.detailed = quality > QUALITY_LOW
+
+    def text_item(self, item_id, text, fontsize, color, **anchor):
+        """A DirtyRegions item for TextCache.draw"""
+        key = (text, fontsize, tuple(int(round(c)) for c in color))
+        return (item_id, key, self.text_cache.rect(text, fontsize, color, **anchor),
+                self.paint_text, (text, fontsize, color, anchor))
+
+    def glow_item(self, item_id, text, fontsize, color, glow_color, offsets, **anchor):
+        """A DirtyRegions item for TextCache.draw_glow"""
+        key = (text, fontsize, tuple(int(round(c)) for c in color), tuple(offsets))
+        rect = self.text_cache.glow_rect(text, fontsize, color, glow_color, offsets, **anchor)
+        return (item_id, key, rect, self.paint_glow,
+                (text, fontsize, color, glow_color, offsets, anchor))
+
+    def paint_text(self, screen, text, fontsize, color, anchor):
+        self.text_cache.draw(screen, text, fontsize, color, **anchor)
+
+    def paint_glow(self, screen, text, fontsize, color, glow_color, offsets, anchor):
+        self.text_cache.draw_glow(screen, text, fontsize, color, glow_color, offsets, **anchor)
+
+    def warm_up(self, game):
+        """Run one step of warm_up_jobs; False once there is nothing left"""
+        if self.warmed_up:
+            return False
+        if self.warm_up_steps is None:
+            self.warm_up_steps = self.warm_up_jobs(game)
+        start = time.perf_counter()
+        with self.profiler.section("warm_up"):
+            self.warmed_up = not next(self.warm_up_steps, False)
+        self.warm_up_seconds += time.perf_counter() - start
+        return not self.warmed_up
+
+    def warm_up_jobs(self, game):
+        """Draw level 1's intro, game and game over screens offscreen
+
+        The fonts, text and sprite frames they need end up in this renderer's
+        caches, so the first real frame of each screen does not load them.
+        """
+        scratch = Renderer()
+        scratch.text_cache = self.text_cache
+        scratch.sprite_cache = self.sprite_cache
+        screen = Screen(new_surface((WIDTH, HEIGHT)))
+        preview = Game(seed=game.seed)
+        preview.start_level()
+        yield True
+        scratch.draw_planet_intro(screen, preview)
+        yield True
+        preview.begin_playing()
+        for sounds_enabled in (True, False):
+            preview.sounds_enabled = sounds_enabled
+            scratch.draw_game(screen, preview)
+            yield True
+        preview.state = STATE_GAME_OVER
+        scratch.draw_game_over(screen, preview)
+        yield True
+        sprites = {enemy.appearance: enemy for enemy in preview.enemies}
+        for sprite in [preview.player, *sprites.values()]:
+            for detailed in (True, False):
+                for phase in range(ANIMATION_FRAMES * ANIMATION_PHASES):
+                    for is_moving in (False, True):
+                        self.sprite_cache.frame_at(sprite, phase, is_moving, detailed)
+                yield True
+
+    def draw(self, screen, game, alpha=1.0):
+        if game.state == STATE_MENU:
+            self.draw_menu(screen, game)
+        elif game.state == STATE_PLANET_INTRO:
+            self.draw_planet_intro(screen, game)
+        elif game.state == STATE_PLAYING:
+            self.draw_game(screen, game, alpha)
+        elif game.state == STATE_GAME_OVER:
+            self.draw_game_over(screen, game)
+        elif game.state == STATE_LEVEL_COMPLETE:
+            self.draw_level_complete(screen, game)
+
+    def draw_planet_intro(self, screen, game):
+        # Build the level's first static chunks while the intro is still on
+        # screen, a few per frame so the intro keeps its frame rate
+        self.follow_player(game)
+        self.static_layer.prepare(game, self.camera, INTRO_CHUNKS_PER_FRAME)
+        
+        if not self.claim_screen(screen, "intro"):
+            self.intro_regions.invalidate()
+        
+        level, stars = self.intro_stars
+        if level != game.level:
+            stars = []
+            for i in range(INTRO_STARS[-1]):
+                pos = ((i * 37 + game.level * 13) % WIDTH, (i * 71) % HEIGHT)
+                size = 1 + (i % 3)
+                stars.append((("star", i), pos, size, star_rect(pos, size)))
+            self.intro_stars = (game.level, stars)
+        stars = stars[:INTRO_STARS[self.quality]]
+        
+        items = []
+        for i, (item_id, pos, size, rect) in enumerate(stars):
+            # pygame truncates colour channels, so only whole steps are visible
+            twinkle = int(abs(math.sin(game.dt_accumulator * 2 + i * 0.5)) * 50 + 205)
+            color = (twinkle, twinkle, twinkle)
+            items.append((item_id, color, rect, draw_star, (pos, size, color)))
+    
+        planet_name = PLANET_NAMES[game.planet % len(PLANET_NAMES)]
+    
+        colors = [
+            (255, 100, 255),  
+            (255, 255, 100),  
+            (200, 100, 255),  
+        ]
+        color_index = (game.level - 1) % len(colors)
+        neon_color = colors[color_index]
+    
+        glow_color = tuple(list(neon_color) + [50])
+        level_glow = range(5, 0, -1)
+        planet_glow = [0] * 5
+        if self.quality < QUALITY_HIGH:
+            level_glow = level_glow[:1]
+            planet_glow = planet_glow[:1]
+        items.append(self.glow_item("level", f"LEVEL {game.level}", 35, neon_color, glow_color,
+                                    level_glow, center=(WIDTH // 2, HEIGHT // 2 - 80)))
+        items.append(self.glow_item("planet", planet_name, 50, neon_color, glow_color,
+                                    planet_glow, center=(WIDTH // 2, HEIGHT // 2)))
+    
+        items.append(self.text_item("ready", "GET READY!", 35, (255, 255, 255), 
+                                    center=(WIDTH // 2, HEIGHT // 2 + 80)))
+    
+        pulse = abs(math.sin(game.dt_accumulator * 3)) * 100 + 155
+        items.append(self.text_item("enemies", f"Enemies: {len(game.enemies)}", 25,
+                                    (pulse, pulse, 255), center=(WIDTH // 2, HEIGHT // 2 + 130)))
+        
+        self.intro_regions.draw(screen, (10, 10, 30), items)
+
+    def draw_menu(self, screen, game):
+        # Nothing on the menu moves, so a kept frame only changes with these
+        state = (game.menu_selection, game.sounds_enabled)
+        if self.claim_screen(screen, "menu"):
+            if state == self.menu_state:
+                # Use the idle frame to get the next screens ready
+                self.warm_up(game)
+                return
+        else:
+            self.menu_regions.invalidate()
+        self.menu_state = state
+        
+        items = []
+        for i in range(50):
+            pos = ((i * 37) % WIDTH, (i * 71) % HEIGHT)
+            brightness = 150 + (i * 13) % 100
+            color = (brightness, brightness, brightness)
+            items.append((("star", i), color, star_rect(pos, 1), draw_star, (pos, 1, color)))
+    
+        items.append(self.text_item("title", "SPACE CAT", 60, (255, 255, 100), center=(WIDTH // 2, 100)))
+        items.append(self.text_item("subtitle", "ADVENTURE", 40, (100, 255, 255), center=(WIDTH // 2, 160)))
+    
+        menu_items = ["START GAME", "MUSIC: ON" if game.sounds_enabled else "MUSIC: OFF", "EXIT"]
+        for i, item in enumerate(menu_items):
+            y = 280 + i * 60
+            color = (255, 255, 0) if i == game.menu_selection else (200, 200, 200)
+            prefix = "> " if i == game.menu_selection else "  "
+            items.append(self.text_item(("item", i), prefix + item, 40, color, center=(WIDTH // 2, y)))
+    
+        items.append(self.text_item("help", "Arrow keys to move and SPACE to select", 25,
+                                    (150, 150, 150), center=(WIDTH // 2, 520)))
+        
+        self.menu_regions.draw(screen, (10, 10, 30), items)
+
+    def follow_player(self, game, alpha=1.0):
+        x, y = game.player.render_position(alpha)
+        self.camera.follow(x, y, game.grid.width * CELL_SIZE, game.grid.height * CELL_SIZE)
+
+    def draw_game(self, screen, game, alpha=1.0):
+        profiler = self.profiler
+        camera = self.camera
+        self.claim_screen(screen, "game")
+        self.follow_player(game, alpha)
+        
+        with profiler.section("static_layer"):
+            self.static_layer.draw(screen, game, camera)
+            self.text_cache.draw(screen, HELP_TEXT, 20, (200, 200, 200),
+                                 bottomleft=(10, HEIGHT - 10))
+        
+        with profiler.section("portal"):
+            portal_x = game.portal['x'] * CELL_SIZE + CELL_SIZE // 2
+            portal_y = game.portal['y'] * CELL_SIZE + CELL_SIZE // 2
+            if camera.sees(portal_x, portal_y, 50):
+                portal_x -= camera.x
+                portal_y -= camera.y
+                portal_pulse = abs(math.sin(game.dt_accumulator * 3)) * 10
+                if self.quality == QUALITY_HIGH:
+                    screen.draw.filled_circle((portal_x, portal_y), 20 + portal_pulse, 
+                                             (100, 100, 255, 100))
+                screen.draw.filled_circle((portal_x, portal_y), 15 + portal_pulse, 
+                                         (150, 150, 255, 150))
+                self.text_cache.draw(screen, "EXIT", 20, (255, 255, 255),
+                                     center=(portal_x, portal_y - 30))
+        
+        with profiler.section("enemies"):
+            if game.swarm is not None:
+                self.sprite_cache.draw_swarm(screen, game.swarm, alpha, camera)
+            else:
+                for enemy in game.enemies:
+                    self.sprite_cache.draw(screen, enemy, alpha, camera)
+        
+        with profiler.section("player"):
+            self.sprite_cache.draw(screen, game.player, alpha, camera)
+        
+        with profiler.section("hud"):
+            self.text_cache.draw(screen, f"LEVEL: {game.level}", 30, (255, 255, 255), topleft=(10, 10))
+            self.text_cache.draw(screen, f"ENEMIES: {len(game.enemies)}", 25, (255, 100, 100), 
+                                 topleft=(10, 45))
+            
+            sound_x, sound_y = SOUND_BUTTON_POS
+            sound_text = "ON" if game.sounds_enabled else "OFF"
+            self.text_cache.draw(screen, f"MUSIC: {sound_text}", 16, (255, 255, 255), center=(sound_x, sound_y))
+            
+            quit_x, quit_y = QUIT_BUTTON_POS
+            self.text_cache.draw(screen, "QUIT", 16, (255, 100, 100), center=(quit_x, quit_y))
+
+    def draw_game_over(self, screen, game):
+        self.draw_game(screen, game)
+        self.text_cache.draw(screen, "GAME OVER", 60, (255, 100, 100), 
+                             center=(WIDTH // 2, HEIGHT // 2 - 20))
+        self.text_cache.draw(screen, "Press SPACE to return to the menu", 25, (255, 255, 255), 
+                             center=(WIDTH // 2, HEIGHT // 2 + 30))
+
+    def draw_level_complete(self, screen, game):
+        self.draw_game(screen, game)
+        self.text_cache.draw(screen, "LEVEL COMPLETE!", 50, (255, 255, 100), 
+                             center=(WIDTH // 2, HEIGHT // 2 - 20))
+        self.text_cache.draw(screen, "Press SPACE to continue", 25, (255, 255, 255), 
+                             center=(WIDTH // 2, HEIGHT // 2 + 30))
+
+
+class QualityGovernor:
+    """Steps a Renderer's detail down when frames run over budget, and back up
+
+    observe() takes the time each frame spent updating and drawing; the
+    wait for the next frame does not count. Every `window` frames the 90th
+    percentile of those times is checked: above `down_ratio` of the budget
+    drops one tier at once, while a tier only comes back after `up_windows`
+    windows in a row under `up_ratio`, so the quality does not flicker.
+    """
+
+    def __init__(self, renderer, budget=1 / 60, window=30, down_ratio=0.9,
+                 up_ratio=0.5, up_windows=4):
+        self.renderer = renderer
+        self.budget = budget
+        self.window = window
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.up_windows = up_windows
+        self.samples = []
+        self.calm_windows = 0
+
+    def observe(self, seconds):
+        samples = self.samples
+        samples.append(seconds)
+        if len(samples) < self.window:
+            return
+        samples.sort()
+        busy = samples[int(0.9 * (len(samples) - 1))]
+        samples.clear()
+
+        quality = self.renderer.quality
+        if busy > self.budget * self.down_ratio:
+            self.calm_windows = 0
+            if quality > QUALITY_LOW:
+                self.renderer.set_quality(quality - 1)
+        elif busy < self.budget * self.up_ratio:
+            self.calm_windows += 1
+            if self.calm_windows >= self.up_windows and quality < QUALITY_HIGH:
+                self.calm_windows = 0
+                self.renderer.set_quality(quality + 1)
+        else:
+            self.calm_windows = 0
+
+
+class ProfilerOverlay:
+    """Frame-time graph and p50/p95/p99 per phase from a FrameProfiler
+
+    The percentile table is recomputed every refresh_frames frames rather
+    than every frame.
+    """
+
+    GRAPH_WIDTH = 240
+    GRAPH_HEIGHT = 70
+    PIXELS_PER_MS = 2
+    BUDGET_MS = 1000 / 60
+
+    def __init__(self, profiler, refresh_frames=30):
+        self.profiler = profiler
+        self.refresh_frames = refresh_frames
+        self.visible = False
+        self.lines = []
+        self.refreshed_at = None
+        self.text_cache = TextCache(max_size=64)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.refreshed_at = None
+
+    def refresh(self):
+        self.lines = [("phase (ms)", "p50", "p95", "p99")]
+        for name, values in self.profiler.summary().items():
+            self.lines.append((name,) + tuple(f"{value:.2f}" for value in values))
+        self.refreshed_at = self.profiler.frames
+
+    def draw(self, screen):
+        if not self.visible:
+            return
+        if (self.refreshed_at is None or
+            self.profiler.frames - self.refreshed_at >= self.refresh_frames):
+            self.refresh()
+        
+        left = 10
+        top = 80
+        height = self.GRAPH_HEIGHT + 8 + 14 * len(self.lines)
+        screen.draw.filled_rect(pygame.Rect(left - 4, top - 4, self.GRAPH_WIDTH + 8, height),
+                                (0, 0, 0))
+        
+        bottom = top + self.GRAPH_HEIGHT
+        frames = self.profiler.recent(FRAME_PHASE)[-self.GRAPH_WIDTH:]
+        for i, frame_time in enumerate(frames):
+            bar = min(self.GRAPH_HEIGHT, frame_time * 1000 * self.PIXELS_PER_MS)
+            color = (255, 80, 80) if frame_time * 1000 > self.BUDGET_MS else (80, 255, 120)
+            screen.draw.line((left + i, bottom), (left + i, bottom - bar), color)
+        budget_y = bottom - self.BUDGET_MS * self.PIXELS_PER_MS
+        screen.draw.line((left, budget_y), (left + self.GRAPH_WIDTH, budget_y), (255, 255, 0))
+        
+        for i, (name, *values) in enumerate(self.lines):
+            y = bottom + 8 + 14 * i
+            self.text_cache.draw(screen, name, 14, (255, 255, 255), topleft=(left, y))
+            for column, value in enumerate(values):
+                self.text_cache.draw(screen, value, 14, (255, 255, 255),
+                                     topright=(left + 150 + 45 * column, y))
@@ -0,0 +1,196 @@
+"""Recording a session's inputs and replaying them exactly
+
+A Recording holds what a Game was created with (seed, grid size, enemy
+engine and behaviour, level pack, tick rate) and every input it received, stamped with
+the logic tick it arrived before. Since all randomness comes from the game's
+seed, feeding the same inputs at the same ticks reproduces the session bit
+for bit; the final state digest saved with the log is checked after
+replaying.
+
+Replay headless at full speed with
+
+    python -m spacecat.replay session.json
+
+or in the window by running game.py with SPACECAT_REPLAY=session.json.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from .clock import DEFAULT_TICK_RATE
+from .core import Game
+from .levelpack import LevelPack
+from .profiler import FrameProfiler
+
+FORMAT_VERSION = 1
+
+
+def state_digest(game):
+    """Hash of everything that decides how the game continues"""
+    player = game.player
+    parts = [game.tick, game.state, game.level, game.menu_selection,
+             game.sounds_enabled, game.rng.getstate()]
+    if player is not None:
+        parts.append((player.grid_x, player.grid_y, player.target_x,
+                      player.target_y, player.x, player.y))
+    for enemy in game.enemies:
+        parts.append((enemy.grid_x, enemy.grid_y, enemy.target_x,
+                      enemy.target_y, enemy.x, enemy.y, enemy.move_timer))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+class Recording:
+    """Game settings plus (tick, action) and (tick, x, y) click events"""
+
+    def __init__(self, seed, grid_width, grid_height, swarm=None, hunters=False,
+                 tick_rate=DEFAULT_TICK_RATE, events=None, ticks=0, digest=None,
+                 level_pack=None):
+        self.seed = seed
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.swarm = swarm
+        self.hunters = hunters
+        self.tick_rate = tick_rate
+        self.events = [] if events is None else events
+        self.ticks = ticks
+        self.digest = digest
+        self.level_pack = level_pack
+
+    @classmethod
+    def start(cls, game, tick_rate=DEFAULT_TICK_RATE):
+        """Record game from here on; it must not have been stepped yet"""
+        pack = game.level_pack
+        recording = cls(game.seed, game.grid.width, game.grid.height,
+                        game.swarm_mode, game.hunters, tick_rate,
+                        level_pack=None if pack is None else os.path.abspath(pack.path))
+        game.recording = recording
+        return recording
+
+    def add_action(self, tick, action):
+        self.events.append((tick, action))
+
+    def add_click(self, tick, pos):
+        self.events.append((tick, pos[0], pos[1]))
+
+    def finish(self, game):
+        self.ticks = game.tick
+        self.digest = state_digest(game)
+
+    def new_game(self, sounds=None):
+        game = Game(sounds, self.seed, self.grid_width, self.grid_height, self.swarm,
+                    self.hunters)
+        if self.level_pack is not None:
+            game.level_pack = LevelPack(self.level_pack)
+        return game
+
+    def save(self, path):
+        log = {
+            "version": FORMAT_VERSION,
+            "seed": self.seed,
+            "grid": [self.grid_width, self.grid_height],
+            "swarm": self.swarm,
+            "hunters": self.hunters,
+            "level_pack": self.level_pack,
+            "tick_rate": self.tick_rate,
+            "ticks": self.ticks,
+            "digest": self.digest,
+            "events": self.events,
+        }
+        with open(path, "w") as f:
+            json.dump(log, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            log = json.load(f)
+        if log.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported recording version {log.get('version')}")
+        grid_width, grid_height = log["grid"]
+        return cls(log["seed"], grid_width, grid_height, log["swarm"],
+                   log.get("hunters", False), log["tick_rate"],
+                   [tuple(event) for event in log["events"]], log["ticks"], log["digest"],
+                   log.get("level_pack"))
+
+
+class Replayer:
+    """Steps a fresh Game through a Recording one logic tick at a time"""
+
+    def __init__(self, recording, sounds=None):
+        self.recording = recording
+        self.game = recording.new_game(sounds)
+        self.step = 1.0 / recording.tick_rate
+        self.position = 0
+        self.actions = []
+
+    @property
+    def done(self):
+        return self.game.tick >= self.recording.ticks or self.game.quit_requested
+
+    def advance(self):
+        game = self.game
+        events = self.recording.events
+        actions = self.actions
+        while self.position < len(events) and events[self.position][0] == game.tick:
+            event = events[self.position]
+            if len(event) == 2:
+                actions.append(event[1])
+            else:
+                game.handle_click((event[1], event[2]))
+            self.position += 1
+        game.step(self.step, actions)
+        actions.clear()
+
+    def run(self, profiler=None):
+        """Replay to the end as fast as possible; return the ticks run"""
+        start = self.game.tick
+        while not self.done:
+            self.advance()
+            if profiler is not None:
+                profiler.end_frame()
+        return self.game.tick - start
+
+    def matches(self):
+        """True if the replay ended in the recorded state"""
+        return state_digest(self.game) == self.recording.digest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.replay",
+                                     description="Replay a recorded session headless")
+    parser.add_argument("recording", help="log written with SPACECAT_RECORD")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="save per-tick phase timings (.json or .csv)")
+    args = parser.parse_args(argv)
+
+    replayer = Replayer(Recording.load(args.recording))
+    profiler = None
+    if args.profile:
+        profiler = FrameProfiler()
+        replayer.game.profiler = profiler
+
+    start = time.perf_counter()
+    ticks = replayer.run(profiler)
+    elapsed = time.perf_counter() - start
+    if profiler is not None:
+        profiler.export(args.profile)
+
+    game = replayer.game
+    recorded_seconds = ticks / replayer.recording.tick_rate
+    speed = recorded_seconds / elapsed if elapsed > 0 else float("inf")
+    print(f"{ticks} ticks ({recorded_seconds:.1f}s of play) in {elapsed:.3f}s, {speed:.0f}x")
+    print(f"ended in state {game.state} on level {game.level}")
+    if replayer.recording.digest is None:
+        return 0
+    if replayer.matches():
+        print("final state matches the recording")
+        return 0
+    print("final state differs from the recording")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Batch simulation of generated levels across worker processes
+
+Every (seed, level) pair is generated with generate_level, loaded into a
+headless Game and played by a scripted player walking the shortest path to
+the portal, while the enemies patrol as usual, or chase the player with
+--hunters. "shortest" walks straight on regardless of enemies; "cautious"
+waits whenever the next cell holds an enemy or one is heading there.
+
+    python -m spacecat.simulate --seeds 1-1000 --levels 1-100 --out sweep.json
+
+The report has one entry per level with how many runs reached the portal,
+collided or ran out of time (generated levels always have a path to it),
+the time to the portal and the simulation throughput; --runs also writes
+one CSV row per simulated level.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+from .cli import SWARM_MODES, parse_grid, parse_range
+from .clock import DEFAULT_TICK_RATE
+from .constants import (
+    GRID_WIDTH, GRID_HEIGHT, STATE_GAME_OVER,
+    ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT,
+)
+from .core import Game
+from .grid import CELL_PORTAL
+from .levels import generate_level
+from .profiler import percentile
+
+
+POLICIES = ("shortest", "cautious")
+OUTCOME_PORTAL = "portal"
+OUTCOME_COLLISION = "collision"
+OUTCOME_TIMEOUT = "timeout"
+PATH_ACTIONS = ((ACTION_UP, 0, -1), (ACTION_DOWN, 0, 1),
+                (ACTION_LEFT, -1, 0), (ACTION_RIGHT, 1, 0))
+RUN_FIELDS = ("seed", "level", "outcome", "path_length", "obstacles", "enemies",
+              "ticks", "game_seconds", "wall_seconds")
+
+_options = None
+
+
+def cell_threatened(game, x, y):
+    if game.swarm is not None:
+        return game.swarm.any_at(x, y) or game.swarm.is_reserved(x, y)
+    index = game.enemy_index
+    return bool(index.enemies_at(x, y)) or index.is_reserved(x, y)
+
+
+def next_action(game, distances, cautious):
+    """Step towards the portal along decreasing BFS distance, or None to wait"""
+    player = game.player
+    if player.is_moving:
+        return None
+    grid = game.grid
+    here = distances[player.grid_y * grid.width + player.grid_x]
+    for action, dx, dy in PATH_ACTIONS:
+        x = player.grid_x + dx
+        y = player.grid_y + dy
+        if not grid.in_bounds(x, y) or distances[y * grid.width + x] != here - 1:
+            continue
+        if cautious and cell_threatened(game, x, y):
+            continue
+        return action
+    return None
+
+
+def simulate_level(seed, level, options):
+    """Play one generated level to the portal, a collision or the time limit"""
+    start = time.perf_counter()
+    game = Game(seed=seed, grid_width=options["grid"][0],
+                grid_height=options["grid"][1], swarm=options["swarm"],
+                hunters=options["hunters"])
+    game.level = level
+    layout = generate_level(level, seed, game.grid.width, game.grid.height)
+    game.load_layout(layout)
+    game.begin_playing()
+
+    dt = 1.0 / options["tick_rate"]
+    max_ticks = int(options["max_seconds"] * options["tick_rate"])
+    cautious = options["policy"] == "cautious"
+    distances = game.grid.distances_from(*layout.portal)
+    player = game.player
+
+    ticks = 0
+    outcome = OUTCOME_TIMEOUT
+    while ticks < max_ticks:
+        action = next_action(game, distances, cautious)
+        if action is not None:
+            game.handle_action(action)
+        game.update_player(dt)
+        game.update_enemies(dt)
+        game.check_collisions()
+        ticks += 1
+        if game.state == STATE_GAME_OVER:
+            outcome = OUTCOME_COLLISION
+            break
+        if game.grid.flags(player.grid_x, player.grid_y) & CELL_PORTAL:
+            outcome = OUTCOME_PORTAL
+            break
+
+    return {
+        "seed": seed,
+        "level": level,
+        "outcome": outcome,
+        "path_length": layout.path_length,
+        "obstacles": len(layout.obstacles),
+        "enemies": len(layout.enemies),
+        "ticks": ticks,
+        "game_seconds": ticks * dt,
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+
+def _init_worker(options):
+    global _options
+    _options = options
+
+
+def _run_task(task):
+    seed, level = task
+    return simulate_level(seed, level, _options)
+
+
+def summarize_level(level, runs):
+    count = len(runs)
+    outcomes = {outcome: 0 for outcome in (OUTCOME_PORTAL, OUTCOME_COLLISION,
+                                           OUTCOME_TIMEOUT)}
+    for run in runs:
+        outcomes[run["outcome"]] += 1
+    times = sorted(run["game_seconds"] for run in runs if run["outcome"] == OUTCOME_PORTAL)
+    ticks = sum(run["ticks"] for run in runs)
+    wall = sum(run["wall_seconds"] for run in runs)
+    return {
+        "level": level,
+        "runs": count,
+        "obstacles": runs[0]["obstacles"],
+        "enemies": runs[0]["enemies"],
+        "portal_rate": outcomes[OUTCOME_PORTAL] / count,
+        "collision_rate": outcomes[OUTCOME_COLLISION] / count,
+        "timeout_rate": outcomes[OUTCOME_TIMEOUT] / count,
+        "mean_path_length": sum(run["path_length"] for run in runs) / count,
+        "time_to_portal_mean_s": sum(times) / len(times) if times else None,
+        "time_to_portal_p50_s": percentile(times, 0.50) if times else None,
+        "time_to_portal_p95_s": percentile(times, 0.95) if times else None,
+        "ticks_per_second": ticks / wall if wall > 0 else 0.0,
+    }
+
+
+def run_batch(seeds, levels, options, workers, runs_path=None, log=sys.stderr):
+    tasks = [(seed, level) for level in levels for seed in seeds]
+    by_level = {level: [] for level in levels}
+    chunksize = max(1, min(64, len(tasks) // (workers * 8)))
+    runs_file = open(runs_path, "w", newline="") if runs_path else None
+    writer = csv.DictWriter(runs_file, RUN_FIELDS) if runs_file else None
+    if writer:
+        writer.writeheader()
+
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(workers, _init_worker, (options,)) as pool:
+            for done, run in enumerate(pool.imap_unordered(_run_task, tasks, chunksize), 1):
+                by_level[run["level"]].append(run)
+                if writer:
+                    writer.writerow(run)
+                if done % 1000 == 0 or done == len(tasks):
+                    elapsed = time.perf_counter() - start
+                    print(f"{done}/{len(tasks)} levels, {done / elapsed:.0f}/s", file=log)
+    finally:
+        if runs_file:
+            runs_file.close()
+    elapsed = time.perf_counter() - start
+
+    total_ticks = sum(run["ticks"] for runs in by_level.values() for run in runs)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workers": workers,
+            "seeds": len(seeds),
+            "levels": len(levels),
+            "options": options,
+            "wall_seconds": elapsed,
+            "levels_per_second": len(tasks) / elapsed if elapsed > 0 else 0.0,
+            "ticks_per_second": total_ticks / elapsed if elapsed > 0 else 0.0,
+        },
+        "levels": [summarize_level(level, by_level[level]) for level in levels],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacecat.simulate",
+                                     description=__doc__.split("\n")[0])
+    parser.add_argument("--seeds", default="1-100",
+                        help="seed ranges, e.g. 1-1000,5000 (default %(default)s)")
+    parser.add_argument("--levels", default="1-50",
+                        help="level ranges (default %(default)s)")
+    parser.add_argument("--grid", default=f"{GRID_WIDTH}x{GRID_HEIGHT}",
+                        help="WxH grid size (default %(default)s)")
+    parser.add_argument("--policy", choices=POLICIES, default="cautious")
+    parser.add_argument("--swarm", choices=SWARM_MODES, default="auto",
+                        help="enemy engine, as Game(swarm=...) (default %(default)s)")
+    parser.add_argument("--hunters", action="store_true",
+                        help="enemies chase the player instead of patrolling")
+    parser.add_argument("--max-seconds", type=float, default=60.0,
+                        help="game time before a run counts as a timeout (default %(default)s)")
+    parser.add_argument("--tick-rate", type=int, default=DEFAULT_TICK_RATE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--runs", metavar="CSV", help="also write every run to this CSV")
+    args = parser.parse_args(argv)
+
+    options = {
+        "grid": list(parse_grid(args.grid)),
+        "policy": args.policy,
+        "swarm": SWARM_MODES[args.swarm],
+        "hunters": args.hunters,
+        "max_seconds": args.max_seconds,
+        "tick_rate": args.tick_rate,
+    }
+    report = run_batch(parse_range(args.seeds), parse_range(args.levels), options,
+                       args.workers, args.runs)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Structure-of-arrays enemy engine for levels with thousands of enemies
+
+Enemy positions, targets, timers and animation frames live in NumPy arrays
+and each tick advances all of them in a few vectorised passes, including
+patrol: every enemy whose timer runs out tries its four directions in a
+random order, one direction rank at a time for the whole batch, and when
+several pick the same free cell in a round only the first of them gets it.
+Hunting works the same way, with each enemy only allowed the steps that get
+closer to the player on the shared flow field.
+
+NumPy is optional and only imported once a Swarm is made, so importing the
+package stays quick; swarm_available() says whether this engine can be used.
+Game.enemies holds EnemyView objects in swarm mode, which read and write the
+arrays through the usual Enemy attribute names so drawing and other per-enemy
+code keep working.
+"""
+
+from importlib.util import find_spec
+
+from .constants import (
+    CELL_SIZE, SPRITE_SPEED, ANIMATION_SPEED, ANIMATION_FRAMES, IDLE_ANIMATION_FACTOR,
+    ENEMY_MOVE_INTERVAL, HUNTER_MOVE_INTERVAL,
+)
+from .clock import DEFAULT_TICK_RATE
+from .grid import CELL_WALL
+
+
+SWARM_MIN_ENEMIES = 200
+ENEMY_TYPES = ("green", "pink")
+DIRECTIONS_X = (0, 0, 1, -1)
+DIRECTIONS_Y = (1, -1, 0, 0)
+
+np = None
+
+
+def swarm_available():
+    return np is not None or find_spec("numpy") is not None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class Swarm:
+
+    def __init__(self, spawns, seed, prototypes):
+        """spawns is a list of (x, y, enemy_type), as in LevelLayout.enemies"""
+        _import_numpy()
+        count = len(spawns)
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+        self.prototypes = prototypes
+
+        self.grid_x = np.array([x for x, _, _ in spawns], dtype=np.int32)
+        self.grid_y = np.array([y for _, y, _ in spawns], dtype=np.int32)
+        self.target_x = self.grid_x.copy()
+        self.target_y = self.grid_y.copy()
+        self.x = (self.grid_x * CELL_SIZE + CELL_SIZE // 2).astype(np.float64)
+        self.y = (self.grid_y * CELL_SIZE + CELL_SIZE // 2).astype(np.float64)
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        self.is_moving = np.zeros(count, dtype=bool)
+        self.animation_frame = np.zeros(count, dtype=np.float64)
+        self.move_timer = np.zeros(count, dtype=np.float64)
+        self.move_interval = self.rng.uniform(*ENEMY_MOVE_INTERVAL, size=count)
+        self.type_code = np.array([ENEMY_TYPES.index(t) for _, _, t in spawns],
+                                  dtype=np.int8)
+
+        self.field_source = None
+        self.field = None
+
+        self.views = [EnemyView(self, i) for i in range(count)]
+
+    def update(self, dt, grid, distances=None):
+        self.update_positions(dt)
+        self.update_animation(dt)
+
+        idle = ~self.is_moving
+        self.move_timer[idle] += dt
+        due = np.flatnonzero(idle & (self.move_timer >= self.move_interval))
+        if due.size:
+            self.move_timer[due] = 0
+            if distances is None:
+                self.move_interval[due] = self.rng.uniform(*ENEMY_MOVE_INTERVAL, size=due.size)
+                self.patrol(due, grid)
+            else:
+                self.move_interval[due] = self.rng.uniform(*HUNTER_MOVE_INTERVAL, size=due.size)
+                self.hunt(due, grid, distances)
+
+    def update_positions(self, dt):
+        np.copyto(self.prev_x, self.x)
+        np.copyto(self.prev_y, self.y)
+
+        target_px = self.target_x * CELL_SIZE + CELL_SIZE // 2
+        target_py = self.target_y * CELL_SIZE + CELL_SIZE // 2
+        dx = target_px - self.x
+        dy = target_py - self.y
+        distance = np.hypot(dx, dy)
+
+        arrived = distance < 2
+        self.x[arrived] = target_px[arrived]
+        self.y[arrived] = target_py[arrived]
+        self.grid_x[arrived] = self.target_x[arrived]
+        self.grid_y[arrived] = self.target_y[arrived]
+
+        moving = ~arrived
+        step = SPRITE_SPEED * dt / distance[moving]
+        self.x[moving] += dx[moving] * step
+        self.y[moving] += dy[moving] * step
+        self.is_moving = moving
+
+    def update_animation(self, dt):
+        frame = self.animation_frame
+        frame += np.where(self.is_moving, ANIMATION_SPEED,
+                          ANIMATION_SPEED * IDLE_ANIMATION_FACTOR) * (dt * DEFAULT_TICK_RATE)
+        frame[frame >= ANIMATION_FRAMES] = 0
+
+    def patrol(self, due, grid):
+        order = np.argsort(self.rng.random((due.size, 4)), axis=1)
+        self.claim(due, grid, np.asarray(DIRECTIONS_X, dtype=np.int32)[order],
+                   np.asarray(DIRECTIONS_Y, dtype=np.int32)[order])
+
+    def hunt(self, due, grid, distances):
+        """Vectorised Enemy.hunt over the enemies in `due`"""
+        if distances is not self.field_source:
+            self.field = np.asarray(distances, dtype=np.int32)
+            self.field_source = distances
+        field = self.field
+        width = grid.width
+        height = grid.height
+
+        here = field[self.grid_y[due] * width + self.grid_x[due]]
+        lost = here < 0
+        if lost.any():
+            self.patrol(due[lost], grid)
+            due = due[~lost]
+            here = here[~lost]
+
+        directions_x = np.broadcast_to(np.asarray(DIRECTIONS_X, dtype=np.int32), (due.size, 4))
+        directions_y = np.broadcast_to(np.asarray(DIRECTIONS_Y, dtype=np.int32), (due.size, 4))
+        new_x = self.grid_x[due, None] + directions_x
+        new_y = self.grid_y[due, None] + directions_y
+        inside = (new_x >= 0) & (new_x < width) & (new_y >= 0) & (new_y < height)
+        ahead = field[np.where(inside, new_y * width + new_x, 0)]
+        closer = inside & (ahead >= 0) & (ahead < here[:, None])
+        self.claim(due, grid, directions_x, directions_y, closer)
+
+    def claim(self, due, grid, directions_x, directions_y, allowed=None):
+        """Reserve a next cell for each enemy in `due`, trying directions by rank
+
+        directions_x/y hold each enemy's four steps in the order to try them;
+        `allowed` can rule some of them out. Walls and reserved cells, including
+        those claimed in an earlier round, are skipped; enemies that find
+        nothing stay where they are.
+        """
+        width = grid.width
+        height = grid.height
+        walls = np.frombuffer(grid.cells, dtype=np.uint8) & CELL_WALL
+        reserved = np.bincount(self.target_y * width + self.target_x,
+                               minlength=width * height)
+        pending = np.arange(due.size)
+
+        for rank in range(4):
+            if not pending.size:
+                break
+            enemies = due[pending]
+            new_x = self.grid_x[enemies] + directions_x[pending, rank]
+            new_y = self.grid_y[enemies] + directions_y[pending, rank]
+            inside = (new_x >= 0) & (new_x < width) & (new_y >= 0) & (new_y < height)
+            cells = np.where(inside, new_y * width + new_x, 0)
+            free = inside & (walls[cells] == 0) & (reserved[cells] == 0)
+            if allowed is not None:
+                free &= allowed[pending, rank]
+
+            candidates = np.flatnonzero(free)
+            _, first = np.unique(cells[candidates], return_index=True)
+            winners = candidates[first]
+
+            moved = enemies[winners]
+            old_cells = self.target_y[moved] * width + self.target_x[moved]
+            np.subtract.at(reserved, old_cells, 1)
+            reserved[cells[winners]] += 1
+            self.target_x[moved] = new_x[winners]
+            self.target_y[moved] = new_y[winners]
+
+            keep = np.ones(pending.size, dtype=bool)
+            keep[winners] = False
+            pending = pending[keep]
+
+    def render_state(self, alpha, phases, bounds=None):
+        """Lists of x, y, animation phase, is_moving and type code per enemy
+
+        x and y are interpolated as in Enemy.render_position and the phase is
+        animation_frame quantised to `phases` steps. With bounds given as
+        (left, top, right, bottom) pixels, only enemies inside are listed.
+        """
+        xs = self.prev_x + (self.x - self.prev_x) * alpha
+        ys = self.prev_y + (self.y - self.prev_y) * alpha
+        frames = self.animation_frame
+        moving = self.is_moving
+        types = self.type_code
+        if bounds is not None:
+            left, top, right, bottom = bounds
+            inside = np.flatnonzero((xs >= left) & (xs < right) & (ys >= top) & (ys < bottom))
+            xs = xs[inside]
+            ys = ys[inside]
+            frames = frames[inside]
+            moving = moving[inside]
+            types = types[inside]
+        return (xs.tolist(), ys.tolist(), (frames * phases).astype(np.int32).tolist(),
+                moving.tolist(), types.tolist())
+
+    def any_at(self, x, y):
+        return bool(np.any((self.grid_x == x) & (self.grid_y == y)))
+
+    def is_reserved(self, x, y):
+        return bool(np.any((self.target_x == x) & (self.target_y == y)))
+
+
+def _array_attribute(name, convert):
+
+    def get(self):
+        return convert(getattr(self.swarm, name)[self.index])
+
+    def set(self, value):
+        getattr(self.swarm, name)[self.index] = value
+
+    return property(get, set)
+
+
+class EnemyView:
+    """One enemy of a Swarm, exposed with the Enemy attribute names"""
+
+    __slots__ = ("swarm", "index", "prototype", "enemy_type", "color", "size",
+                 "appearance")
+
+    grid_x = _array_attribute("grid_x", int)
+    grid_y = _array_attribute("grid_y", int)
+    target_x = _array_attribute("target_x", int)
+    target_y = _array_attribute("target_y", int)
+    x = _array_attribute("x", float)
+    y = _array_attribute("y", float)
+    prev_x = _array_attribute("prev_x", float)
+    prev_y = _array_attribute("prev_y", float)
+    is_moving = _array_attribute("is_moving", bool)
+    animation_frame = _array_attribute("animation_frame", float)
+    move_timer = _array_attribute("move_timer", float)
+    move_interval = _array_attribute("move_interval", float)
+
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+        self.prototype = swarm.prototypes[ENEMY_TYPES[swarm.type_code[index]]]
+        self.enemy_type = self.prototype.enemy_type
+        self.color = self.prototype.color
+        self.size = self.prototype.size
+        self.appearance = self.prototype.appearance
+
+    def render_position(self, alpha):
+        i = self.index
+        swarm = self.swarm
+        prev_x = swarm.prev_x[i]
+        prev_y = swarm.prev_y[i]
+        return (float(prev_x + (swarm.x[i] - prev_x) * alpha),
+                float(prev_y + (swarm.y[i] - prev_y) * alpha))
+
+    def appearance_key(self):
+        return self.prototype.appearance_key()
+
+    def draw_at(self, screen, x, y, animation_frame, is_moving, detailed=True):
+        self.prototype.draw_at(screen, x, y, animation_frame, is_moving, detailed)
+
+    def draw(self, screen):
+        self.draw_at(screen, self.x, self.y, self.animation_frame, self.is_moving)